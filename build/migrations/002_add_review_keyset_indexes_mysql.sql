@@ -0,0 +1,8 @@
+-- Migration: indexes backing keyset pagination of reviews (MySQL)
+-- 002_add_review_keyset_indexes_mysql.sql
+
+-- GET /reviews?limit=&cursor=
+CREATE INDEX idx_reviews_created_at_id ON reviews (created_at, id);
+
+-- GET /reviews/<studySpotId>?limit=&cursor=
+CREATE INDEX idx_reviews_spot_created_at_id ON reviews (studySpotId, created_at, id);
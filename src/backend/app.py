@@ -1,32 +1,70 @@
 """
 Flask application entry point
+create_app() builds the app without touching the database: pools, caches and
+indexes are built on first use, or ahead of time by the opt-in WARMUP thread.
+gunicorn serves the module-level `app` (gunicorn app:app).
 """
+import os
+
 from flask import Flask, jsonify
 from flask_cors import CORS
-import sys
-import os
-from dotenv import load_dotenv
 
-# Add the backend directory to the path
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from services.settings import env_flag, load_settings
+
+# Load Project/.env and backend/.env before any module reads its settings
+load_settings()
 
 from routes.study_spots import study_spots_bp
 from routes.reviews import reviews_bp
+from routes.encoding import init_encoding
+from routes.metrics import init_instrumentation
+from routes.read_routing import init_read_routing
+from services.database import READ_PIN_HEADER, get_all_study_spots
+from services.recommendation import precompute_recommendations
+from services.warmup import start_warmup
 
-# Load environment variables from backend/.env if present
-load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"))
 
-app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
-
-# Register blueprints
-app.register_blueprint(study_spots_bp)
-app.register_blueprint(reviews_bp)
-
-@app.route("/")
 def root():
     return jsonify({"message": "UWDialed API is running"})
 
+
+def start_background_work():
+    """
+    Start the opt-in WARMUP and RECOMMENDATION_PRECOMPUTE threads.
+    """
+    if env_flag("WARMUP"):
+        start_warmup()
+    # Optionally rank every survey combination up front so /study-spots/recommend is a lookup
+    if env_flag("RECOMMENDATION_PRECOMPUTE"):
+        precompute_recommendations(get_all_study_spots)
+
+
+def create_app() -> Flask:
+    """
+    Build and configure the Flask app.
+    Set WARMUP=1 to open the pool and load the catalog, indexes and review
+    aggregates on a background thread instead of on the first requests.
+    A preloading gunicorn master sets DEFER_BACKGROUND_WORK: threads don't
+    survive fork, so each worker starts them itself (see gunicorn.conf.py).
+    """
+    app = Flask(__name__)
+    CORS(app, expose_headers=[READ_PIN_HEADER])  # Enable CORS for all routes; let browsers read the pin
+    init_instrumentation(app)  # Request timing, Server-Timing and /metrics
+    init_encoding(app)  # Compact JSON and gzip/brotli responses
+    init_read_routing(app)  # Pin a client's reads to the primary right after it writes
+
+    # Register blueprints
+    app.register_blueprint(study_spots_bp)
+    app.register_blueprint(reviews_bp)
+    app.add_url_rule("/", view_func=root)
+
+    if not env_flag("DEFER_BACKGROUND_WORK"):
+        start_background_work()
+    return app
+
+
+app = create_app()
+
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 5001))
     app.run(host="0.0.0.0", port=port, debug=False)
@@ -0,0 +1,275 @@
+"""
+ASGI entry point: the core API as async handlers.
+Serves the same JSON contracts as the Flask app for GET /, GET /study-spots,
+GET /study-spots/<id>, POST /study-spots/recommend, GET /reviews,
+GET /reviews/<id> and POST /reviews, but a request waiting on the database
+no longer ties up a worker. Run it with an ASGI server, e.g.
+    uvicorn asgi:app --host 0.0.0.0 --port $PORT --workers 2
+The Flask app (app.py) remains the full API: streaming, pagination, filters,
+conditional GET, bulk import, compression and /metrics are served there.
+"""
+import json
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from services import async_database as db
+from services.database import READ_PIN_HEADER, read_pin_header, reset_read_pin, set_read_pin
+from services.metrics import REQUEST_DURATION, finish_request_timing, request_timings, span, start_request_timing
+from services.recommendation import (
+    DEFAULT_RECOMMENDATIONS,
+    MAX_RECOMMENDATIONS,
+    parse_location,
+    recommend,
+    recommend_nearby,
+)
+from routes.encoding import dumps_compact
+from routes.metrics import SERVER_TIMING_ENABLED, server_timing_header
+
+# Same answers flask-cors gives with its defaults
+CORS_ALLOW_METHODS = "DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"
+REQUIRED_REVIEW_FIELDS = ("studySpotId", "name", "stars", "review")
+
+Result = Tuple[int, Any]
+
+
+class Request:
+    """
+    The parts of an HTTP request the handlers need.
+    """
+
+    def __init__(self, scope: Dict[str, Any], body: bytes, path_args: Tuple[str, ...] = ()):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.args = {key: values[0] for key, values in parse_qs(scope.get("query_string", b"").decode()).items()}
+        self.headers = {key.decode().lower(): value.decode() for key, value in scope.get("headers", [])}
+        self.body = body
+        self.path_args = path_args
+
+    def get_json(self) -> Any:
+        """
+        The parsed JSON body, or None if it is missing, not JSON or malformed
+        (like Flask's request.get_json(silent=True)).
+        """
+        mimetype = self.headers.get("content-type", "").split(";")[0].strip().lower()
+        if not (mimetype == "application/json" or mimetype.endswith("+json")):
+            return None
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            return None
+
+    def int_arg(self, name: str) -> Optional[int]:
+        try:
+            return int(self.args[name])
+        except (KeyError, ValueError):
+            return None
+
+
+async def root(request: Request) -> Result:
+    return 200, {"message": "UWDialed API is running"}
+
+
+async def get_study_spots(request: Request) -> Result:
+    try:
+        return 200, {"study_spots": await db.get_all_study_spots()}
+    except Exception as e:
+        return 500, {"error": f"Error fetching study spots: {str(e)}"}
+
+
+async def get_study_spot_by_id(request: Request) -> Result:
+    try:
+        spot = await db.get_study_spot(int(request.path_args[0]))
+        if not spot:
+            return 404, {"error": "Study spot not found"}
+        return 200, spot
+    except Exception as e:
+        return 500, {"error": f"Error fetching study spot: {str(e)}"}
+
+
+async def recommend_study_spot(request: Request) -> Result:
+    preferences = request.get_json() or {}
+    if not preferences:
+        return 400, {"error": "Missing survey preferences in request body."}
+    if not isinstance(preferences, dict):
+        return 400, {"error": "Survey preferences must be a JSON object."}
+
+    k = DEFAULT_RECOMMENDATIONS
+    if "k" in request.args:
+        k = request.int_arg("k")
+        if k is None or not (1 <= k <= MAX_RECOMMENDATIONS):
+            return 400, {"error": f"k must be an integer between 1 and {MAX_RECOMMENDATIONS}."}
+
+    try:
+        location = parse_location(preferences)
+    except ValueError as e:
+        return 400, {"error": str(e)}
+
+    try:
+        spots = await db.get_all_study_spots()
+        if not spots:
+            return 404, {"error": "No study spots available to recommend."}
+        if location is None:
+            return 200, {"recommended_spots": recommend(spots, preferences, k)}
+        return 200, {"recommended_spots": recommend_nearby(spots, preferences, location, k)}
+    except Exception as e:
+        return 500, {"error": f"Error generating recommendation: {str(e)}"}
+
+
+async def create_review(request: Request) -> Result:
+    try:
+        data = request.get_json()
+        if not data:
+            return 400, {"error": "Missing request body"}
+        for field in REQUIRED_REVIEW_FIELDS:
+            if field not in data:
+                return 400, {"error": f"Missing required field: {field}"}
+
+        result = await db.add_review(
+            study_spot_id=data["studySpotId"],
+            name=data["name"],
+            stars=data["stars"],
+            review=data["review"],
+        )
+        return (201 if result.get("status") == "success" else 500), result
+    except ValueError as e:
+        return 400, {"error": str(e)}
+    except Exception as e:
+        return 500, {"error": f"Error creating review: {str(e)}"}
+
+
+async def get_reviews(request: Request) -> Result:
+    try:
+        study_spot_id = request.int_arg("studySpotId")
+        if study_spot_id:
+            reviews = await db.get_reviews_by_study_spot(study_spot_id)
+        else:
+            reviews = await db.get_all_reviews()
+        return 200, {"reviews": reviews}
+    except ValueError as e:
+        return 400, {"error": str(e)}
+    except Exception as e:
+        return 500, {"error": f"Error fetching reviews: {str(e)}"}
+
+
+async def get_reviews_for_study_spot(request: Request) -> Result:
+    try:
+        return 200, {"reviews": await db.get_reviews_by_study_spot(int(request.path_args[0]))}
+    except ValueError as e:
+        return 400, {"error": str(e)}
+    except Exception as e:
+        return 500, {"error": f"Error fetching reviews: {str(e)}"}
+
+
+Handler = Callable[[Request], Awaitable[Result]]
+ROUTES: List[Tuple[str, "re.Pattern[str]", str, Handler]] = [
+    ("GET", re.compile(r"/"), "/", root),
+    ("GET", re.compile(r"/study-spots"), "/study-spots", get_study_spots),
+    ("GET", re.compile(r"/study-spots/(\d+)"), "/study-spots/<int:spot_id>", get_study_spot_by_id),
+    ("POST", re.compile(r"/study-spots/recommend"), "/study-spots/recommend", recommend_study_spot),
+    ("GET", re.compile(r"/reviews"), "/reviews", get_reviews),
+    ("POST", re.compile(r"/reviews"), "/reviews", create_review),
+    ("GET", re.compile(r"/reviews/(\d+)"), "/reviews/<int:study_spot_id>", get_reviews_for_study_spot),
+]
+
+
+def resolve(method: str, path: str) -> Tuple[Optional[Handler], Optional[str], Tuple[str, ...], bool]:
+    """
+    Find the handler for a request.
+    Returns:
+        (handler, route rule, path arguments, path exists under another method)
+    """
+    path_matched = False
+    for route_method, pattern, rule, handler in ROUTES:
+        match = pattern.fullmatch(path)
+        if match is None:
+            continue
+        if route_method == method or (method == "HEAD" and route_method == "GET"):
+            return handler, rule, match.groups(), True
+        path_matched = True
+    return None, None, (), path_matched
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def _send(send, status: int, body: bytes, headers: List[Tuple[bytes, bytes]]):
+    headers = headers + [(b"content-length", str(len(body)).encode())]
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return None
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await db.close_async_pool()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    """
+    The ASGI application.
+    """
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+
+    started = time.perf_counter()
+    token = start_request_timing()
+    pin_token = set_read_pin(_header(scope, READ_PIN_HEADER.lower().encode()))
+    try:
+        method = scope["method"]
+        cors = [(b"access-control-allow-origin", b"*")]
+        if method == "OPTIONS":
+            requested = dict(scope.get("headers", [])).get(b"access-control-request-headers", b"")
+            cors += [(b"access-control-allow-methods", CORS_ALLOW_METHODS.encode())]
+            if requested:
+                cors.append((b"access-control-allow-headers", requested))
+            return await _send(send, 200, b"", cors)
+
+        handler, rule, path_args, path_matched = resolve(method, scope["path"])
+        if handler is None:
+            status, payload = (405, {"error": "Method not allowed"}) if path_matched else (404, {"error": "Not found"})
+        else:
+            request = Request(scope, await _read_body(receive), path_args)
+            status, payload = await handler(request)
+
+        with span("json"):
+            body = (dumps_compact(payload) + "\n").encode()
+        total = time.perf_counter() - started
+        REQUEST_DURATION.observe(total, method=method, route=rule or "unmatched", status=str(status))
+        headers = cors + [(b"content-type", b"application/json")]
+        pin = read_pin_header()
+        if pin is not None:
+            headers += [(READ_PIN_HEADER.lower().encode(), pin.encode()),
+                        (b"access-control-expose-headers", READ_PIN_HEADER.encode())]
+        if SERVER_TIMING_ENABLED:
+            headers.append((b"server-timing", server_timing_header(request_timings(), total).encode()))
+        if method == "HEAD":
+            await send({"type": "http.response.start", "status": status,
+                        "headers": headers + [(b"content-length", str(len(body)).encode())]})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await _send(send, status, body, headers)
+    finally:
+        reset_read_pin(pin_token)
+        finish_request_timing(token)
@@ -0,0 +1,4 @@
+"""
+Standalone benchmarks for the backend. Run from src/backend, e.g.
+    python -m benchmarks.encoding
+"""
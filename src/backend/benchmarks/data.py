@@ -0,0 +1,59 @@
+"""
+Synthetic study spot and review data shaped like the production tables.
+"""
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List
+
+BUSYNESS_VALUES = (1, 2, 3, 4, 5)
+POWER_VALUES = ("Y", "Limited", "N")
+FOOD_VALUES = ("Cafeteria", "Vending machines", "Coffee shop", "None")
+NOISE_VALUES = ("very quiet", "quiet", "moderate", "loud")
+LIGHTING_VALUES = ("Well", "Yes", "Some", "No")
+REVIEW_WORDS = ("quiet", "busy", "great", "outlets", "cold", "bright", "crowded", "cozy")
+
+
+def make_study_spots(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    `count` study spot rows scattered around campus.
+    """
+    rng = random.Random(seed)
+    return [
+        {
+            "id": i,
+            "location": f"Building {rng.randint(1, 60)} room {rng.randint(100, 4999)}",
+            "latitude": round(43.4723 + rng.uniform(-0.02, 0.02), 6),
+            "longitude": round(-80.5449 + rng.uniform(-0.02, 0.02), 6),
+            "busyness_estimate": rng.choice(BUSYNESS_VALUES),
+            "power_options": rng.choice(POWER_VALUES),
+            "nearby_food_drink_options": rng.choice(FOOD_VALUES),
+            "noise_level": rng.choice(NOISE_VALUES),
+            "natural_lighting": rng.choice(LIGHTING_VALUES),
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def iter_reviews(count: int, spot_count: int = 20, seed: int = 0) -> Iterator[Dict[str, Any]]:
+    """
+    Yield `count` review rows as the review getters return them (formatted
+    timestamps), without holding them all in memory.
+    """
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    for i in range(1, count + 1):
+        yield {
+            "id": i,
+            "studySpotId": rng.randint(1, spot_count),
+            "name": f"Student {rng.randint(1, 5000)}",
+            "stars": rng.randint(1, 5),
+            "review": " ".join(rng.choice(REVIEW_WORDS) for _ in range(rng.randint(3, 30))),
+            "created_at": (start + timedelta(minutes=i)).strftime("%Y-%m-%d %H:%M:%S"),
+        }
+
+
+def make_reviews(count: int, spot_count: int = 20, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    `count` review rows as a list.
+    """
+    return list(iter_reviews(count, spot_count, seed))
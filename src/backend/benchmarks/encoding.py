@@ -0,0 +1,73 @@
+"""
+Bytes on the wire and encode time for each endpoint's payload, comparing
+Flask's default JSON provider with CompactJSONProvider and each content coding.
+
+Usage (from src/backend):
+    python -m benchmarks.encoding [--spots 20] [--reviews 2000] [--repeat 20]
+"""
+import argparse
+import sys
+import time
+from typing import Callable, List, Optional
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from benchmarks.data import make_reviews, make_study_spots
+from routes.encoding import CompactJSONProvider, available_encodings, compress
+
+
+def _best_time(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def payloads(spot_count: int, review_count: int):
+    spots = make_study_spots(spot_count)
+    reviews = make_reviews(review_count, spot_count)
+    return {
+        "GET /study-spots": {"study_spots": spots},
+        "GET /study-spots/<id>": {"study_spot": spots[0]},
+        "POST /study-spots/recommend": {"recommended_spots": spots[:5]},
+        "GET /reviews": {"reviews": reviews},
+        "GET /reviews/<id>": {"reviews": [r for r in reviews if r["studySpotId"] == 1]},
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark response encoding per endpoint.")
+    parser.add_argument("--spots", type=int, default=20, help="Study spots in the catalog")
+    parser.add_argument("--reviews", type=int, default=2000, help="Reviews in the table")
+    parser.add_argument("--repeat", type=int, default=20, help="Timing repetitions (best is reported)")
+    args = parser.parse_args(argv)
+
+    app = Flask(__name__)
+    default = DefaultJSONProvider(app)
+    compact = CompactJSONProvider(app)
+
+    print(f"{'endpoint':<28} {'encoder':<8} {'coding':<9} {'bytes':>10} {'encode ms':>10} {'total ms':>10}")
+    for endpoint, payload in payloads(args.spots, args.reviews).items():
+        # Flask's jsonify uses compact separators outside debug mode, so compare against that
+        encoders = (
+            ("default", lambda: default.dumps(payload, separators=(",", ":")).encode()),
+            ("compact", lambda: compact.dumps(payload).encode()),
+        )
+        for name, encode in encoders:
+            body = encode()
+            encode_s = _best_time(encode, args.repeat)
+            for coding in ("identity",) + available_encodings():
+                if coding == "identity":
+                    size, total_s = len(body), encode_s
+                else:
+                    size = len(compress(body, coding))
+                    total_s = encode_s + _best_time(lambda: compress(body, coding), args.repeat)
+                print(f"{endpoint:<28} {name:<8} {coding:<9} {size:>10} {encode_s * 1000:>10.3f} {total_s * 1000:>10.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
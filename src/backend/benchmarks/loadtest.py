@@ -0,0 +1,118 @@
+"""
+HTTP load test: many concurrent keep-alive clients against running servers.
+Use it to compare the Flask app under gunicorn with the ASGI app under uvicorn
+at the same concurrency, e.g. with both serving the same database:
+
+    gunicorn app:app --bind 127.0.0.1:8000 --workers 2
+    uvicorn asgi:app --port 8001 --workers 2
+    python -m benchmarks.loadtest http://127.0.0.1:8000/reviews/7 http://127.0.0.1:8001/reviews/7 \\
+        --concurrency 64 --duration 10
+
+Usage (from src/backend):
+    python -m benchmarks.loadtest URL [URL ...] [--concurrency 32] [--duration 10] [--method GET] [--json BODY]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+def _request_bytes(method: str, url: str, body: bytes) -> bytes:
+    parts = urlsplit(url)
+    target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+    lines = [f"{method} {target} HTTP/1.1", f"Host: {parts.netloc}", "Connection: keep-alive"]
+    if body:
+        lines += ["Content-Type: application/json", f"Content-Length: {len(body)}"]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode() + body
+
+
+async def _read_response(reader: asyncio.StreamReader) -> Tuple[int, bool]:
+    head = await reader.readuntil(b"\r\n\r\n")
+    status_line, *header_lines = head.decode("latin-1").split("\r\n")
+    headers = dict(line.split(":", 1) for line in header_lines if ":" in line)
+    headers = {name.strip().lower(): value.strip() for name, value in headers.items()}
+    if "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    elif headers.get("transfer-encoding", "").lower() == "chunked":
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    # Servers without keep-alive (gunicorn's sync workers) close after each response
+    return int(status_line.split()[1]), headers.get("connection", "").lower() != "close"
+
+
+async def _client(url: str, request: bytes, deadline: float, timings: List[float], errors: List[str]):
+    parts = urlsplit(url)
+    connection = None
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            if connection is None:
+                connection = await asyncio.open_connection(parts.hostname, parts.port or 80)
+            reader, writer = connection
+            writer.write(request)
+            await writer.drain()
+            status, keep_alive = await _read_response(reader)
+        except (OSError, asyncio.IncompleteReadError, ValueError) as err:
+            errors.append(type(err).__name__)
+            if connection is not None:
+                connection[1].close()
+            connection = None
+            continue
+        timings.append(time.perf_counter() - start)
+        if not keep_alive:
+            writer.close()
+            connection = None
+        if status >= 400:
+            errors.append(f"HTTP {status}")
+    if connection is not None:
+        connection[1].close()
+
+
+async def load(url: str, concurrency: int, duration: float, method: str = "GET", body: bytes = b"") -> Dict[str, float]:
+    """
+    Send requests to `url` from `concurrency` connections for `duration` seconds.
+    Returns:
+        Requests, errors, requests per second and p50/p99 latency in milliseconds
+    """
+    request = _request_bytes(method, url, body)
+    timings: List[float] = []
+    errors: List[str] = []
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(_client(url, request, deadline, timings, errors) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    timings.sort()
+    count = len(timings)
+    return {
+        "requests": count,
+        "errors": len(errors),
+        "req_per_sec": count / elapsed if elapsed else 0.0,
+        "p50_ms": timings[count // 2] * 1000 if count else 0.0,
+        "p99_ms": timings[min(count - 1, int(count * 0.99))] * 1000 if count else 0.0,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test one or more running servers.")
+    parser.add_argument("urls", nargs="+", help="URLs to load, one after another")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent keep-alive connections")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per URL")
+    parser.add_argument("--method", default="GET")
+    parser.add_argument("--json", default="", help="Request body, sent as application/json")
+    args = parser.parse_args(argv)
+
+    print(f"{'url':<48} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for url in args.urls:
+        r = asyncio.run(load(url, args.concurrency, args.duration, args.method.upper(), args.json.encode()))
+        print(f"{url:<48} {r['requests']:>9} {r['errors']:>7} {r['req_per_sec']:>9.1f} "
+              f"{r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
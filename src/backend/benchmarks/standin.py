@@ -0,0 +1,62 @@
+"""
+A local stand-in for the MySQL database: a temporary file served by the
+embedded SQLite backend (services/sqlite_backend.py), filled with synthetic
+rows, so benchmarks exercise the real service and route code without a
+network round trip.
+"""
+import os
+import shutil
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List
+from unittest import mock
+
+import services.database as database
+from services import sqlite_backend
+
+SPOT_COLUMNS = ("id", "location", "latitude", "longitude", "busyness_estimate", "power_options",
+                "nearby_food_drink_options", "noise_level", "natural_lighting")
+REVIEW_COLUMNS = ("id", "studySpotId", "name", "stars", "review", "created_at")
+
+
+class StandInDatabase:
+    """
+    An SQLite file holding `spots` and `reviews`.
+    """
+
+    def __init__(self, spots: List[Dict[str, Any]], reviews: Iterable[Dict[str, Any]] = ()):
+        self._dir = tempfile.mkdtemp(prefix="uwdialed-bench-")
+        self.path = os.path.join(self._dir, "standin.db")
+        sqlite_backend.init_schema(self.path)
+        connection = sqlite3.connect(self.path)
+        try:
+            connection.executemany(
+                f"INSERT INTO UWDialedStudyData VALUES ({', '.join('?' * len(SPOT_COLUMNS))})",
+                ([spot.get(c) for c in SPOT_COLUMNS] for spot in spots),
+            )
+            connection.executemany(
+                f"INSERT INTO reviews VALUES ({', '.join('?' * len(REVIEW_COLUMNS))})",
+                ([review[c] for c in REVIEW_COLUMNS] for review in reviews),
+            )
+            connection.commit()
+        finally:
+            connection.close()
+
+    def connect(self) -> sqlite_backend.SQLiteConnection:
+        return sqlite_backend.connect(self.path)
+
+    @contextmanager
+    def installed(self):
+        """
+        Point services.database's connection pool at this database while the block runs.
+        """
+        database.reset_pool()
+        with mock.patch.object(database, "_connect", self.connect):
+            try:
+                yield self
+            finally:
+                database.reset_pool()
+
+    def remove(self):
+        shutil.rmtree(self._dir, ignore_errors=True)
@@ -0,0 +1,133 @@
+"""
+Startup time: from a fresh interpreter to the first response.
+Each run starts a new Python process, so module imports, create_app() and the
+first request's lazy initialization are all paid again, as on a cold worker.
+
+  interpreter   process spawned -> python ready to run `import app`
+  import        `import app` started -> done (includes create_app())
+  first request `import app` done -> first response received
+  total         process spawned -> first response received
+
+--server gunicorn instead boots a real gunicorn worker and measures from spawning
+the process until the first response arrives over HTTP.
+
+Usage (from src/backend):
+    python -m benchmarks.startup [--repeat 5] [--path /] [--server gunicorn]
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_IN_PROCESS = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get(sys.argv[1])
+answered = time.perf_counter()
+print(json.dumps({"status": response.status_code, "import_ms": (imported - started) * 1000,
+                  "first_request_ms": (answered - imported) * 1000}))
+"""
+
+
+def run_in_process(path: str) -> Dict[str, float]:
+    """
+    Import the app in a fresh interpreter and serve one request through the test client.
+    """
+    spawned = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", _IN_PROCESS, path],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    ).stdout
+    total = (time.perf_counter() - spawned) * 1000
+    result = json.loads(output.strip().splitlines()[-1])
+    if result["status"] >= 500:
+        raise RuntimeError(f"GET {path} returned {result['status']}")
+    # Interpreter startup is everything before `import app` began
+    return {
+        "interpreter_ms": total - result["import_ms"] - result["first_request_ms"],
+        "import_ms": result["import_ms"],
+        "first_request_ms": result["first_request_ms"],
+        "total_ms": total,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _get(port: int, path: str) -> Optional[int]:
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=1) as sock:
+            sock.sendall(f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode())
+            status_line = sock.makefile("rb").readline()
+    except OSError:
+        return None
+    return int(status_line.split()[1]) if status_line else None
+
+
+def run_gunicorn(path: str, timeout: float = 30.0) -> Dict[str, float]:
+    """
+    Boot one gunicorn worker and poll until it answers `path`.
+    """
+    port = _free_port()
+    spawned = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "app:app", "--bind", f"127.0.0.1:{port}", "--workers", "1"],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - spawned < timeout:
+            status = _get(port, path)
+            if status is not None:
+                if status >= 500:
+                    raise RuntimeError(f"GET {path} returned {status}")
+                return {"total_ms": (time.perf_counter() - spawned) * 1000}
+            if process.poll() is not None:
+                raise RuntimeError(f"gunicorn exited with status {process.returncode}")
+            time.sleep(0.005)
+        raise RuntimeError(f"No response within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def summarize(runs: List[Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    return {
+        key: {"median": statistics.median(run[key] for run in runs), "min": min(run[key] for run in runs)}
+        for key in runs[0]
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure import-to-first-response time.")
+    parser.add_argument("--repeat", type=int, default=5, help="Cold starts to measure")
+    parser.add_argument("--path", default="/", help="Path of the first request")
+    parser.add_argument("--server", choices=("test-client", "gunicorn"), default="test-client")
+    args = parser.parse_args(argv)
+
+    run = run_gunicorn if args.server == "gunicorn" else run_in_process
+    try:
+        runs = [run(args.path) for _ in range(args.repeat)]
+    except (RuntimeError, subprocess.CalledProcessError) as err:
+        print(f"Startup benchmark failed: {err}", file=sys.stderr)
+        return 1
+
+    print(f"{'phase':<18} {'median ms':>10} {'min ms':>10}")
+    for key, stats in summarize(runs).items():
+        print(f"{key[:-3]:<18} {stats['median']:>10.1f} {stats['min']:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
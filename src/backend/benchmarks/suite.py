@@ -0,0 +1,259 @@
+"""
+Benchmark suite for the backend hot paths.
+
+Runs the real routes and services against synthetic catalogs and review tables
+held in a local stand-in database (see benchmarks/standin.py), and reports
+ops/sec, p50/p99 latency and peak traced memory per benchmark. Results can be
+saved as a baseline and later runs compared against it.
+
+Usage (from src/backend):
+    python -m benchmarks.suite                          # 20/1k/100k spots, 10k/1M reviews
+    python -m benchmarks.suite --spots 20,1000 --reviews 10000 --save main
+    python -m benchmarks.suite --compare main --threshold 0.1
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from app import app
+from benchmarks.data import iter_reviews, make_study_spots
+from benchmarks.standin import StandInDatabase
+from routes.caching import encoded_responses
+from services.database import invalidate_study_spot_cache
+from services.recommendation import BUSYNESS_MAP, LIGHTING_MAP, POWER_MAP, recommendation_cache, score_study_spot
+from services.review_aggregates import review_aggregates
+
+DEFAULT_SPOT_COUNTS = (20, 1000, 100000)
+DEFAULT_REVIEW_COUNTS = (10000, 1000000)
+# Spots the review table is spread over
+REVIEW_SPOT_COUNT = 1000
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+# Untimed calls first: the first fills the catalog cache, the second the encoded responses
+WARMUP_CALLS = 2
+# Metrics where a larger value is an improvement
+HIGHER_IS_BETTER = {"ops_per_sec"}
+
+Benchmark = Tuple[str, Callable[[], Any]]
+
+
+def _surveys() -> Iterator[Dict[str, str]]:
+    """
+    Cycle through every busyness / power / lighting survey combination.
+    """
+    combos = itertools.product(BUSYNESS_MAP, POWER_MAP, LIGHTING_MAP)
+    return itertools.cycle(
+        [{"busyness": b, "powerAccess": p, "lighting": l, "noiseLevel": b} for b, p, l in combos]
+    )
+
+
+def _request(client, method: str, url: str, expected: int = 200, **kwargs) -> Callable[[], Any]:
+    def call():
+        response = client.open(url, method=method, **kwargs)
+        if response.status_code != expected:
+            raise RuntimeError(f"{method} {url} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        return response
+    return call
+
+
+def reset_caches():
+    """
+    Drop every in-process cache so each dataset starts cold.
+    """
+    invalidate_study_spot_cache()
+    recommendation_cache.clear()
+    encoded_responses.clear()
+    review_aggregates.invalidate()
+
+
+def catalog_benchmarks(client, spots: List[Dict[str, Any]]) -> List[Benchmark]:
+    surveys = _surveys()
+    preferences = {"busyness": "quiet", "powerAccess": "essential", "lighting": "bright natural light"}
+    middle_id = spots[len(spots) // 2]["id"]
+
+    def recommend_uncached():
+        recommendation_cache.clear()
+        return _request(client, "POST", "/study-spots/recommend", json=next(surveys))()
+
+    return [
+        ("score_study_spot (all spots)", lambda: [score_study_spot(spot, preferences) for spot in spots]),
+        ("GET /study-spots", _request(client, "GET", "/study-spots")),
+        ("GET /study-spots gzip", _request(client, "GET", "/study-spots", headers={"Accept-Encoding": "gzip"})),
+        ("GET /study-spots/<id>", _request(client, "GET", f"/study-spots/{middle_id}")),
+        ("GET /study-spots filtered", _request(client, "GET", "/study-spots?noise_level=quiet&sort=busyness-asc&limit=20")),
+        ("POST /study-spots/recommend", lambda: _request(client, "POST", "/study-spots/recommend", json=next(surveys))()),
+        ("POST /study-spots/recommend uncached", recommend_uncached),
+    ]
+
+
+def review_benchmarks(client) -> List[Benchmark]:
+    review = {"studySpotId": 1, "name": "Benchmark", "stars": 4, "review": "Quiet with plenty of outlets."}
+    return [
+        ("GET /reviews", _request(client, "GET", "/reviews")),
+        ("GET /reviews?limit=50", _request(client, "GET", "/reviews?limit=50")),
+        ("GET /reviews/<id>", _request(client, "GET", "/reviews/7")),
+        ("GET /reviews/<id>/summary", _request(client, "GET", "/reviews/7/summary")),
+        ("POST /reviews", _request(client, "POST", "/reviews", expected=201, json=review)),
+    ]
+
+
+def measure(fn: Callable[[], Any], min_time: float, min_rounds: int, max_rounds: int) -> Dict[str, float]:
+    """
+    Time `fn` after WARMUP_CALLS untimed calls, then trace one more call for peak memory.
+    """
+    for _ in range(WARMUP_CALLS):
+        fn()
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < max_rounds and (len(timings) < min_rounds or time.perf_counter() - started < min_time):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    total = sum(timings)
+    timings.sort()
+
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "rounds": len(timings),
+        "ops_per_sec": len(timings) / total if total else float("inf"),
+        "p50_ms": timings[len(timings) // 2] * 1000,
+        "p99_ms": timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1000,
+        "peak_kib": peak / 1024,
+    }
+
+
+def run(spot_counts, review_counts, min_time: float, min_rounds: int, max_rounds: int,
+        only: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    results = {}
+    client = app.test_client()
+
+    def run_group(label: str, benchmarks: List[Benchmark]):
+        for name, fn in benchmarks:
+            key = f"{name} [{label}]"
+            if only and only not in key:
+                continue
+            results[key] = measure(fn, min_time, min_rounds, max_rounds)
+            print(format_row(key, results[key]), flush=True)
+
+    print(format_header())
+    for count in spot_counts:
+        spots = make_study_spots(count)
+        database = StandInDatabase(spots, iter_reviews(1000, count))
+        try:
+            with database.installed():
+                reset_caches()
+                run_group(f"{count} spots", catalog_benchmarks(client, spots))
+        finally:
+            database.remove()
+
+    for count in review_counts:
+        database = StandInDatabase(make_study_spots(REVIEW_SPOT_COUNT), iter_reviews(count, REVIEW_SPOT_COUNT))
+        try:
+            with database.installed():
+                reset_caches()
+                run_group(f"{count} reviews", review_benchmarks(client))
+        finally:
+            database.remove()
+    reset_caches()
+    return results
+
+
+def format_header() -> str:
+    return f"{'benchmark':<58} {'rounds':>7} {'ops/sec':>11} {'p50 ms':>10} {'p99 ms':>10} {'peak KiB':>11}"
+
+
+def format_row(key: str, r: Dict[str, float]) -> str:
+    return (f"{key:<58} {r['rounds']:>7} {r['ops_per_sec']:>11.1f} {r['p50_ms']:>10.3f} "
+            f"{r['p99_ms']:>10.3f} {r['peak_kib']:>11.1f}")
+
+
+def baseline_path(name: str) -> str:
+    return name if name.endswith(".json") else os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def save_baseline(name: str, results: Dict[str, Dict[str, float]]) -> str:
+    path = baseline_path(name)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.platform(),
+            "results": results,
+        }, f, indent=2, sort_keys=True)
+    return path
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            threshold: float) -> List[str]:
+    """
+    Print each metric's change against `baseline` and return the regressions
+    worse than `threshold` (a fraction, e.g. 0.1 for 10%).
+    """
+    regressions = []
+    print(f"\n{'benchmark':<58} {'metric':<12} {'baseline':>12} {'current':>12} {'change':>9}")
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        for metric in ("ops_per_sec", "p50_ms", "p99_ms", "peak_kib"):
+            before, after = previous.get(metric), current[metric]
+            if not before:
+                continue
+            change = (after - before) / before
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            flag = "  REGRESSION" if worse > threshold else ""
+            print(f"{key:<58} {metric:<12} {before:>12.3f} {after:>12.3f} {change:>+8.1%}{flag}")
+            if flag:
+                regressions.append(f"{key} {metric}")
+    return regressions
+
+
+def _counts(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()] if value else []
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the backend hot paths against a local stand-in database.")
+    parser.add_argument("--spots", type=_counts, default=list(DEFAULT_SPOT_COUNTS),
+                        help="Comma-separated catalog sizes (default: 20,1000,100000; empty to skip)")
+    parser.add_argument("--reviews", type=_counts, default=list(DEFAULT_REVIEW_COUNTS),
+                        help="Comma-separated review table sizes (default: 10000,1000000; empty to skip)")
+    parser.add_argument("--only", help="Only run benchmarks whose name contains this text")
+    parser.add_argument("--min-time", type=float, default=1.0, help="Seconds to spend timing each benchmark")
+    parser.add_argument("--min-rounds", type=int, default=5, help="Timed calls per benchmark, at least")
+    parser.add_argument("--max-rounds", type=int, default=2000, help="Timed calls per benchmark, at most")
+    parser.add_argument("--save", metavar="NAME", help="Save results as baselines/NAME.json (or to a .json path)")
+    parser.add_argument("--compare", metavar="NAME", help="Compare results against a saved baseline")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="Relative change counted as a regression when comparing (default: 0.1)")
+    args = parser.parse_args(argv)
+
+    results = run(args.spots, args.reviews, args.min_time, args.min_rounds, args.max_rounds, args.only)
+
+    if args.save:
+        print(f"\nSaved baseline to {save_baseline(args.save, results)}")
+    if args.compare:
+        with open(baseline_path(args.compare), encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+"""
+gunicorn settings, read automatically when gunicorn starts in this directory.
+
+Workers share one study spot catalog snapshot (services/catalog_snapshot.py):
+the master picks a snapshot directory and publishes the first generation before
+forking, so a new worker attaches to it instead of querying the database, and
+later refreshes are done by one worker for all of them. CATALOG_SNAPSHOT_DIR
+chooses the directory (default: a temporary one removed on shutdown);
+CATALOG_SNAPSHOT=0 turns sharing off.
+
+GUNICORN_PRELOAD=1 also imports the app in the master and attaches the
+snapshot there, so workers inherit the decoded catalog and scoring engine
+copy-on-write instead of each building their own. The WARMUP and
+RECOMMENDATION_PRECOMPUTE threads are then started in each worker, not in
+the master, where fork would leave them behind.
+"""
+import gc
+import os
+import shutil
+import tempfile
+
+_created_dir = None
+if os.getenv("CATALOG_SNAPSHOT", "1").lower() not in ("0", "false", "no") and not os.getenv("CATALOG_SNAPSHOT_DIR"):
+    _created_dir = tempfile.mkdtemp(prefix="uwdialed-catalog-")
+    # Inherited by every worker the master forks
+    os.environ["CATALOG_SNAPSHOT_DIR"] = _created_dir
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "").lower() in ("1", "true", "yes")
+if preload_app:
+    # create_app() in the master must not start threads; post_worker_init does it per worker
+    os.environ["DEFER_BACKGROUND_WORK"] = "1"
+
+
+def when_ready(server):
+    if not os.getenv("CATALOG_SNAPSHOT_DIR"):
+        return
+    from services import database
+
+    if database.shared_catalog is None:
+        return
+    snapshot = database.shared_catalog.publish()
+    if snapshot is None:
+        server.log.warning("Catalog snapshot not published; the first worker request will retry")
+    else:
+        server.log.info("Published catalog snapshot generation %s (%s spots)", snapshot.generation, len(snapshot.rows))
+    if preload_app:
+        # Attach in the master so every fork starts with the catalog and its indexes
+        database.get_all_study_spots()
+        # Keep these objects out of the collector so it doesn't write to (and copy) their pages in workers
+        gc.freeze()
+    # Workers open their own connections; don't leave the master's idle in its pool
+    database.reset_pool()
+
+
+def post_worker_init(worker):
+    if preload_app:
+        from app import start_background_work
+
+        start_background_work()
+
+
+def on_exit(server):
+    if _created_dir:
+        shutil.rmtree(_created_dir, ignore_errors=True)
@@ -0,0 +1,144 @@
+"""
+HTTP validators (ETag / Last-Modified) and conditional GET helpers
+"""
+import os
+import threading
+from datetime import datetime
+
+from flask import Response, current_app, jsonify, request
+from werkzeug.http import is_resource_modified
+
+from routes.encoding import COMPRESSION_MIN_SIZE, compress, negotiate_encoding
+
+CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", "0"))
+# Most encoded bodies kept per data version by EncodedResponseCache
+ENCODED_RESPONSE_CACHE_SIZE = int(os.getenv("ENCODED_RESPONSE_CACHE_SIZE", "2048"))
+
+
+def _set_cache_headers(response, etag, last_modified):
+    if etag:
+        response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.public = True
+    response.cache_control.max_age = CACHE_MAX_AGE
+    response.cache_control.must_revalidate = True
+    return response
+
+
+def not_modified(etag, last_modified=None):
+    """
+    Return a body-less 304 if the request's If-None-Match / If-Modified-Since
+    match the given validators, otherwise None.
+    """
+    if not (request.if_none_match or request.if_modified_since):
+        return None
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        return None
+    return _set_cache_headers(Response(status=304), etag, last_modified)
+
+
+def conditional_json(payload, etag=None, last_modified=None):
+    """
+    jsonify `payload` with ETag, Last-Modified and Cache-Control headers, turning it
+    into a 304 if the request already has this version.
+    Without an explicit `etag` one is derived from the response body.
+    """
+    response = jsonify(payload)
+    if etag is None:
+        response.add_etag()
+        etag, _ = response.get_etag()
+    _set_cache_headers(response, etag, last_modified)
+    return response.make_conditional(request)
+
+
+def latest_timestamp(rows, column="created_at", fmt="%Y-%m-%d %H:%M:%S"):
+    """
+    Return the newest `column` value in `rows` as a datetime, or None.
+    """
+    values = [row.get(column) for row in rows if row.get(column)]
+    if not values:
+        return None
+    latest = max(values)
+    return datetime.strptime(latest, fmt) if isinstance(latest, str) else latest
+
+
+class EncodedResponseCache:
+    """
+    Already-encoded JSON bodies, and their compressed variants, for data that only
+    changes with a known version (e.g. the study spot catalog digest). Every entry
+    is dropped when the version changes, so a hit is just a copy of stored bytes.
+    """
+
+    def __init__(self, max_entries=ENCODED_RESPONSE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._version = None
+        self._bodies = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version, build_payload=None, coding=None):
+        """
+        Return (body, coding) for `key` at `version`, encoding build_payload() on a miss.
+        `coding` is the requested content coding; the returned one is None when the
+        body is too small to be worth compressing. With no build_payload, a miss
+        returns None instead.
+        """
+        with self._lock:
+            if version != self._version:
+                self._version = version
+                self._bodies = {}
+            variants = self._bodies.get(key)
+            if variants is not None and coding in variants:
+                self.hits += 1
+                return variants[coding]
+            if build_payload is None and variants is None:
+                return None
+            self.misses += 1
+
+        if variants is None:
+            identity = (current_app.json.dumps(build_payload()) + "\n").encode()
+            variants = {None: (identity, None)}
+        identity = variants[None][0]
+        if coding is not None:
+            if len(identity) >= COMPRESSION_MIN_SIZE:
+                variants[coding] = (compress(identity, coding), coding)
+            else:
+                variants[coding] = variants[None]
+
+        with self._lock:
+            if version == self._version and (key in self._bodies or len(self._bodies) < self.max_entries):
+                self._bodies[key] = variants
+        return variants[coding]
+
+    def clear(self):
+        with self._lock:
+            self._version = None
+            self._bodies = {}
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._bodies), "hits": self.hits, "misses": self.misses}
+
+
+encoded_responses = EncodedResponseCache()
+
+
+def cached_json(key, version, build_payload, etag, last_modified=None):
+    """
+    Like conditional_json(), but serves bytes encoded once per `version` from
+    encoded_responses. build_payload() is only called on a miss; pass None to
+    get None back on a miss instead.
+    """
+    cached = encoded_responses.get(key, version, build_payload, negotiate_encoding())
+    if cached is None:
+        return None
+    body, coding = cached
+    response = current_app.response_class(body, mimetype="application/json")
+    _set_cache_headers(response, etag, last_modified)
+    response.vary.add("Accept-Encoding")
+    if coding:
+        response.headers["Content-Encoding"] = coding
+        response.set_etag(etag, weak=True)
+    return response.make_conditional(request)
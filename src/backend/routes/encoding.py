@@ -0,0 +1,134 @@
+"""
+Response encoding: compact JSON and negotiated gzip / brotli compression
+"""
+import gzip
+import json
+import os
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+from services.metrics import span
+
+try:
+    import orjson
+except ImportError:  # optional, the stdlib encoder is used without it
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional, only gzip is offered without it
+    brotli = None
+
+# Bodies smaller than this are sent as-is; compressing them costs more than it saves
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "500"))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSIBLE_MIMETYPES = ("application/json", "text/html", "text/plain", "text/csv")
+
+
+def dumps_compact(obj):
+    """
+    Encode `obj` as compact JSON text, the same way jsonify does in this app.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(
+                obj,
+                default=DefaultJSONProvider.default,
+                # Let Flask's default() format dates so the wire format doesn't change
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+            ).decode()
+        except TypeError:
+            pass  # e.g. integers wider than 64 bits; the stdlib encoder handles them
+    return json.dumps(obj, default=DefaultJSONProvider.default, ensure_ascii=True, separators=(",", ":"))
+
+
+class CompactJSONProvider(DefaultJSONProvider):
+    """
+    jsonify without whitespace or key sorting, using orjson when it is installed.
+    Output decodes to the same values as Flask's default provider.
+    """
+
+    compact = True
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        with span("json"):
+            return self._dumps(obj, **kwargs)
+
+    def _dumps(self, obj, **kwargs):
+        if not kwargs:
+            return dumps_compact(obj)
+        kwargs.setdefault("separators", (",", ":"))
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps(obj) + "\n", mimetype=self.mimetype)
+
+
+def compress(data, encoding):
+    """
+    Compress `data` with "gzip" or "br".
+    """
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def available_encodings():
+    """
+    Content codings this server can produce, most preferred first.
+    """
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding():
+    """
+    Pick the best content coding the client accepts, or None for identity.
+    """
+    encoding = request.accept_encodings.best_match(available_encodings())
+    return encoding if encoding in available_encodings() else None
+
+
+def compress_response(response):
+    """
+    after_request hook: compress eligible responses for clients that accept it.
+    Streamed, small, already-encoded and non-text responses are left alone.
+    """
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESSION_MIN_SIZE:
+        return response
+
+    with span("compress"):
+        response.set_data(compress(data, encoding))
+    response.headers["Content-Encoding"] = encoding
+    # The compressed bytes differ from the identity ones, so the validator becomes weak
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def init_encoding(app):
+    """
+    Install the compact JSON provider and response compression on `app`.
+    """
+    app.json_provider_class = CompactJSONProvider
+    app.json = CompactJSONProvider(app)
+    app.after_request(compress_response)
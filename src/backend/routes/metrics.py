@@ -0,0 +1,75 @@
+"""
+Request timing, Server-Timing headers and the Prometheus /metrics endpoint
+"""
+import os
+import time
+
+from flask import Blueprint, Response, g, request
+
+from services.metrics import (
+    REQUEST_DURATION,
+    finish_request_timing,
+    render_metrics,
+    request_timings,
+    start_request_timing,
+)
+
+# Set SERVER_TIMING=0 to stop exposing the per-request breakdown to clients
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING", "1").lower() not in ("0", "false", "no")
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+@metrics_bp.route("/metrics", methods=["GET"])
+def get_metrics():
+    """
+    Request latency histograms per route, span latencies and database query
+    counts for this process, in Prometheus text format.
+    """
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+
+def server_timing_header(timings, total):
+    """
+    Format spans as a Server-Timing header value, e.g. `db.reviews.all;dur=4.2, app;dur=5.0`.
+    """
+    entries = [
+        f'{name};dur={seconds * 1000:.2f}' + (f';desc="{calls} calls"' if calls > 1 else "")
+        for name, (seconds, calls) in timings.items()
+    ]
+    entries.append(f"app;dur={total * 1000:.2f}")
+    return ", ".join(entries)
+
+
+def _start_timer():
+    g.request_started = time.perf_counter()
+    g.request_timing_token = start_request_timing()
+
+
+def _record_request(response):
+    started = g.get("request_started")
+    if started is None:
+        return response
+    total = time.perf_counter() - started
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    REQUEST_DURATION.observe(total, method=request.method, route=route, status=str(response.status_code))
+    if SERVER_TIMING_ENABLED:
+        response.headers["Server-Timing"] = server_timing_header(request_timings(), total)
+    return response
+
+
+def _stop_timer(_exc=None):
+    token = g.pop("request_timing_token", None)
+    if token is not None:
+        finish_request_timing(token)
+
+
+def init_instrumentation(app):
+    """
+    Time every request on `app` and serve /metrics.
+    Register before other after_request hooks so compression is included in the timing.
+    """
+    app.register_blueprint(metrics_bp)
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
+    app.teardown_request(_stop_timer)
@@ -0,0 +1,34 @@
+"""
+Carry each client's read-your-own-writes pin through its requests: a client
+that just wrote gets READ_PIN_HEADER back and sends it with its next requests,
+so their reads go to the primary on whichever worker serves them.
+"""
+from flask import g, request
+
+from services.database import READ_PIN_HEADER, read_pin_header, reset_read_pin, set_read_pin
+
+
+def _start_pin():
+    g.read_pin_token = set_read_pin(request.headers.get(READ_PIN_HEADER))
+
+
+def _send_pin(response):
+    value = read_pin_header()
+    if value is not None:
+        response.headers[READ_PIN_HEADER] = value
+    return response
+
+
+def _forget_pin(_exc=None):
+    token = g.pop("read_pin_token", None)
+    if token is not None:
+        reset_read_pin(token)
+
+
+def init_read_routing(app):
+    """
+    Honour and hand back the read pin on every request to `app`.
+    """
+    app.before_request(_start_pin)
+    app.after_request(_send_pin)
+    app.teardown_request(_forget_pin)
@@ -2,21 +2,75 @@
 Flask routes for reviews endpoints
 """
 from flask import Blueprint, jsonify, request
-import sys
-import os
+import io
 
-# Add the backend directory to the path
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from services.reviews_backend import add_review, get_all_reviews, get_reviews_by_study_spot
+from services.reviews_backend import (
+    DEFAULT_PAGE_SIZE,
+    add_review,
+    get_all_reviews,
+    get_reviews_by_study_spot,
+    get_reviews_page,
+    get_reviews_version,
+    stream_reviews,
+)
+from services.review_aggregates import get_review_summary
+from services.review_ingestion import enqueue_review, write_behind_enabled
+from services.review_import import DEFAULT_CHUNK_SIZE, detect_format, import_reviews, parse_reviews
+from routes.caching import conditional_json, latest_timestamp, not_modified
+from routes.streaming import stream_format, stream_response
 
 reviews_bp = Blueprint('reviews', __name__)
 
+PAGINATION_ARGS = ("limit", "cursor", "fields")
+
+
+def _paginated_reviews(study_spot_id):
+    """
+    Serve a keyset-paginated page when the client asks for one with
+    ?limit=, ?cursor= or ?fields=. Returns None for a plain full listing.
+    """
+    if not any(arg in request.args for arg in PAGINATION_ARGS):
+        return None
+
+    limit = DEFAULT_PAGE_SIZE
+    if "limit" in request.args:
+        limit = request.args.get("limit", type=int)
+        if limit is None:
+            raise ValueError("Limit must be an integer.")
+    fields = request.args.get("fields")
+    page = get_reviews_page(
+        study_spot_id=study_spot_id,
+        limit=limit,
+        cursor=request.args.get("cursor") or None,
+        fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+    )
+    return jsonify(page)
+
+
+def _full_listing(study_spot_id, load_reviews):
+    """
+    Serve a full review listing with validators from the listing's version
+    token, so a revalidation that still matches never reads the reviews.
+    Falls back to an ETag hashed from the body if the version can't be read.
+    """
+    version = get_reviews_version(study_spot_id)
+    if version is not None:
+        cached = not_modified(*version)
+        if cached is not None:
+            return cached
+
+    reviews = load_reviews()
+    if version is None:
+        return conditional_json({"reviews": reviews}, last_modified=latest_timestamp(reviews))
+    return conditional_json({"reviews": reviews}, *version)
+
 
 @reviews_bp.route("/reviews", methods=["POST"])
 def create_review():
     """
     Create a new review for a study spot.
+    With REVIEW_INGESTION_MODE=async the review is queued and saved in the
+    background, and the response is 202 instead of 201.
     Expected JSON body:
     {
         "studySpotId": int,
@@ -37,6 +91,19 @@ def create_review():
             if field not in data:
                 return jsonify({"error": f"Missing required field: {field}"}), 400
         
+        if write_behind_enabled():
+            queued = enqueue_review(
+                study_spot_id=data["studySpotId"],
+                name=data["name"],
+                stars=data["stars"],
+                review=data["review"]
+            )
+            if not queued:
+                response = jsonify({"error": "Too many reviews are waiting to be saved. Please retry shortly."})
+                response.headers["Retry-After"] = "1"
+                return response, 503
+            return jsonify({"message": "Review accepted", "status": "queued"}), 202
+
         # Call the backend service
         result = add_review(
             study_spot_id=data["studySpotId"],
@@ -56,21 +123,57 @@ def create_review():
         return jsonify({"error": f"Error creating review: {str(e)}"}), 500
 
 
+@reviews_bp.route("/reviews/bulk", methods=["POST"])
+def bulk_import_reviews():
+    """
+    Import many reviews in one request.
+    Accepts a JSON array body, an NDJSON (application/x-ndjson) or CSV (text/csv)
+    body, or a multipart upload in the "file" field. ?format= overrides detection.
+    Every row is validated like POST /reviews; bad rows are reported by position
+    and the rest are saved in chunked transactions.
+    """
+    try:
+        upload = request.files.get("file")
+        if upload is not None:
+            fmt = request.args.get("format") or detect_format(upload.filename, upload.mimetype)
+            raw = upload.stream
+        else:
+            fmt = request.args.get("format") or detect_format(content_type=request.content_type)
+            raw = request.stream
+
+        chunk_size = request.args.get("chunk_size", default=DEFAULT_CHUNK_SIZE, type=int)
+        stream = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+        result = import_reviews(parse_reviews(stream, fmt), chunk_size)
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Error importing reviews: {str(e)}"}), 500
+
+
 @reviews_bp.route("/reviews", methods=["GET"])
 def get_reviews():
     """
     Get all reviews from the database.
     Optionally filter by studySpotId using query parameter: ?studySpotId=<id>
+    Pass ?limit=, ?cursor= and/or ?fields= to page through the results instead,
+    or ?stream=1 / ?stream=ndjson to stream the full listing.
+    The full listing supports conditional GET via ETag / Last-Modified.
     """
     try:
         study_spot_id = request.args.get("studySpotId", type=int)
-        
+
+        fmt = stream_format()
+        if fmt:
+            return stream_response("reviews", stream_reviews(study_spot_id or None), fmt)
+
+        page = _paginated_reviews(study_spot_id or None)
+        if page is not None:
+            return page
+
         if study_spot_id:
-            reviews = get_reviews_by_study_spot(study_spot_id)
-        else:
-            reviews = get_all_reviews()
-        
-        return jsonify({"reviews": reviews})
+            return _full_listing(study_spot_id, lambda: get_reviews_by_study_spot(study_spot_id))
+        return _full_listing(None, get_all_reviews)
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
@@ -81,12 +184,38 @@ def get_reviews():
 def get_reviews_for_study_spot(study_spot_id):
     """
     Get all reviews for a specific study spot.
+    Pass ?limit=, ?cursor= and/or ?fields= to page through the results instead,
+    or ?stream=1 / ?stream=ndjson to stream the full listing.
+    The full listing supports conditional GET via ETag / Last-Modified.
     """
     try:
-        reviews = get_reviews_by_study_spot(study_spot_id)
-        return jsonify({"reviews": reviews})
+        fmt = stream_format()
+        if fmt:
+            return stream_response("reviews", stream_reviews(study_spot_id), fmt)
+
+        page = _paginated_reviews(study_spot_id)
+        if page is not None:
+            return page
+
+        return _full_listing(study_spot_id, lambda: get_reviews_by_study_spot(study_spot_id))
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": f"Error fetching reviews: {str(e)}"}), 500
 
+
+@reviews_bp.route("/reviews/<int:study_spot_id>/summary", methods=["GET"])
+def get_review_summary_for_study_spot(study_spot_id):
+    """
+    Get the rating summary for a study spot: review count, average stars and a
+    1-5 star histogram.
+    """
+    try:
+        summary = get_review_summary(study_spot_id)
+        if summary is None:
+            return jsonify({"error": "Error fetching review summary: database unavailable"}), 500
+        return jsonify(summary)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Error fetching review summary: {str(e)}"}), 500
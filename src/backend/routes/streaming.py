@@ -0,0 +1,54 @@
+"""
+Helpers for streaming large JSON listings
+"""
+from flask import Response, current_app, request
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+CHUNK_ROWS = 100
+
+
+def stream_format():
+    """
+    Decide whether the client asked for a streamed listing.
+    Returns "ndjson" for ?stream=ndjson or Accept: application/x-ndjson,
+    "json" for ?stream=1, and None for a regular response.
+    """
+    stream = request.args.get("stream", "").lower()
+    if stream == "ndjson":
+        return "ndjson"
+    if request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE]) == NDJSON_MIMETYPE:
+        return "ndjson"
+    if stream in ("1", "true", "json"):
+        return "json"
+    return None
+
+
+def stream_response(key, rows, fmt):
+    """
+    Encode `rows` incrementally, CHUNK_ROWS at a time, so memory use does not
+    grow with the size of the listing.
+    "json" keeps the regular {key: [...]} shape; "ndjson" writes one object per line.
+    """
+    dumps = current_app.json.dumps
+
+    def generate():
+        chunk = []
+        first = True
+        if fmt == "json":
+            yield '{"%s": [' % key
+        for row in rows:
+            if fmt == "ndjson":
+                chunk.append(dumps(row) + "\n")
+            else:
+                chunk.append(dumps(row) if first else "," + dumps(row))
+                first = False
+            if len(chunk) >= CHUNK_ROWS:
+                yield "".join(chunk)
+                chunk = []
+        if chunk:
+            yield "".join(chunk)
+        if fmt == "json":
+            yield "]}\n"
+
+    mimetype = NDJSON_MIMETYPE if fmt == "ndjson" else "application/json"
+    return Response(generate(), mimetype=mimetype)
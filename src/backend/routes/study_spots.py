@@ -2,125 +2,224 @@
 Flask routes for study spots endpoints
 """
 from flask import Blueprint, jsonify, request
-import sys
-import os
-import random
-
-# Add the backend directory to the path
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from services.database import get_all_study_spots
-
-BUSYNESS_MAP = {
-    "very quiet": 1,
-    "quiet": 2,
-    "moderate": 3,
-    "busy/active": 4,
-    "loud": 5,
-}
-
-POWER_MAP = {
-    "essential": {"Y": 2, "Limited": 1, "N": 0},
-    "helpful but not required": {"Y": 2, "Limited": 1, "N": 0},
-    "not important": {"Y": 1, "Limited": 1, "N": 1},
-}
-
-LIGHTING_MAP = {
-    "bright natural light": "Well",
-    "some natural light": "Yes",
-    "low/no natural light": "No",
-}
-
-# Maps survey preference keys to columns that exist in UWDialedStudyData.
-# Only attributes represented in the database are included here.
-PREFERENCE_COLUMN_MAP = {
-    "busyness": "busyness_estimate",
-    "powerAccess": "power_options",
-    "foodPreference": "nearby_food_drink_options",
-    "noiseLevel": "noise_level",
-    "lighting": "natural_lighting",
-}
-
-
-def score_study_spot(spot, preferences):
-    """
-    Return a numeric score that represents how well `spot` matches `preferences`.
-    """
-    score = 0
-
-    for pref_key, column_key in PREFERENCE_COLUMN_MAP.items():
-        pref_value = preferences.get(pref_key)
-        if not pref_value or pref_value.lower() == "no preference":
-            continue
-
-        spot_value = spot.get(column_key)
-        if not spot_value:
-            continue
-
-        # Normalize strings for comparison
-        if column_key == "busyness_estimate":
-            desired = BUSYNESS_MAP.get(pref_value.lower())
-            try:
-                spot_busyness = int(spot_value)
-            except (TypeError, ValueError):
-                spot_busyness = None
-            if desired is not None and spot_busyness is not None:
-                score += max(0, 3 - abs(spot_busyness - desired))
-            continue
-
-        if column_key == "power_options":
-            power_scores = POWER_MAP.get(pref_value.lower())
-            if power_scores:
-                score += power_scores.get(spot_value, 0)
-            continue
-
-        if column_key == "nearby_food_drink_options":
-            if pref_value.lower() in spot_value.lower():
-                score += 2
-            elif pref_value.lower() == "no preference":
-                score += 1
-            continue
-
-        if column_key == "noise_level":
-            if pref_value.lower() in spot_value.lower():
-                score += 2
-            continue
-
-        if column_key == "natural_lighting":
-            mapped_pref = LIGHTING_MAP.get(pref_value.lower())
-            if mapped_pref and mapped_pref.lower() in spot_value.lower():
-                score += 2
-            continue
-
-    return score
+
+from services.database import (
+    get_all_study_spots,
+    get_nearby_study_spots,
+    get_study_spot,
+    get_study_spot_catalog_version,
+)
+from services.recommendation import (
+    DEFAULT_RECOMMENDATIONS,
+    MAX_BATCH_SIZE,
+    MAX_RECOMMENDATIONS,
+    parse_location,
+    recommend,
+    recommend_batch,
+    recommend_nearby,
+)
+# The scoring tables and reference scorer used to live in this module; keep them importable from here
+from services.recommendation import BUSYNESS_MAP, LIGHTING_MAP, POWER_MAP, PREFERENCE_COLUMN_MAP, score_study_spot  # noqa: F401
+from services.facets import SORT_OPTIONS, get_facet_index
+from services.review_aggregates import get_review_summaries
+from routes.caching import cached_json, conditional_json, not_modified
+from routes.streaming import stream_format, stream_response
 
 study_spots_bp = Blueprint('study_spots', __name__)
 
+DEFAULT_NEARBY_RADIUS_M = 1000
+MAX_NEARBY_RADIUS_M = 50000
+DEFAULT_NEARBY_LIMIT = 10
+MAX_NEARBY_LIMIT = 50
+
+# Query parameters that switch GET /study-spots to the filtered listing
+EQUALITY_FILTERS = ("noise_level", "power_options", "nearby_food_drink_options", "natural_lighting")
+CATALOG_QUERY_ARGS = EQUALITY_FILTERS + ("busyness", "busyness_min", "busyness_max", "sort", "limit")
+
+
+def _recommendation_count():
+    """
+    Read ?k= from the query string. Returns None if it is not a valid count.
+    """
+    if "k" not in request.args:
+        return DEFAULT_RECOMMENDATIONS
+    k = request.args.get("k", type=int)
+    if k is None or not (1 <= k <= MAX_RECOMMENDATIONS):
+        return None
+    return k
+
+
+def _with_ratings(study_spots):
+    """
+    Copy each spot with its review summary attached as "rating" (None if unavailable).
+    """
+    summaries = get_review_summaries([spot.get("id") for spot in study_spots]) or {}
+    return [{**spot, "rating": summaries.get(spot.get("id"))} for spot in study_spots]
+
+
+def _int_arg(name, minimum=None):
+    value = request.args.get(name)
+    if value is None or value == "":
+        return None
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer.")
+    if minimum is not None and number < minimum:
+        raise ValueError(f"{name} must be at least {minimum}.")
+    return number
+
+
+def _catalog_query():
+    """
+    Parse the filter / sort / limit query parameters of GET /study-spots.
+    Returns None when none are given. Raises ValueError on invalid values.
+    """
+    if not any(name in request.args for name in CATALOG_QUERY_ARGS):
+        return None
+
+    equals = {}
+    for column in EQUALITY_FILTERS:
+        values = [v for value in request.args.getlist(column) for v in value.split(",") if v]
+        if values:
+            equals[column] = values
+
+    busyness_min = _int_arg("busyness_min")
+    busyness_max = _int_arg("busyness_max")
+    busyness = _int_arg("busyness")
+    if busyness is not None:
+        equals["busyness_estimate"] = [busyness]
+
+    sort = request.args.get("sort") or None
+    if sort is not None and sort not in SORT_OPTIONS:
+        raise ValueError(f"sort must be one of: {', '.join(SORT_OPTIONS)}.")
+
+    return {
+        "equals": equals,
+        "busyness_min": busyness_min,
+        "busyness_max": busyness_max,
+        "sort": sort,
+        "limit": _int_arg("limit", minimum=1),
+    }
+
+
+def _filtered_study_spots(study_spots, query):
+    """
+    Apply a parsed catalog query using the facet index.
+    Returns (matching spots, total before limit, facet counts).
+    """
+    index = get_facet_index(study_spots)
+    bits = index.select(query["equals"], query["busyness_min"], query["busyness_max"])
+    results = index.ordered(bits, query["sort"], query["limit"])
+    return results, index.count(bits), index.facet_counts(bits)
+
 
 @study_spots_bp.route("/study-spots", methods=["GET"])
 def get_study_spots():
     """
     Get all study spots from the database.
     Returns a list of study spots with their locations and details.
+    Pass ?stream=1 or ?stream=ndjson to stream the listing.
+    Pass ?include=ratings to add each spot's review summary as "rating".
+    Supports conditional GET via ETag / Last-Modified.
+
+    Filtering: busyness, busyness_min, busyness_max, noise_level, power_options,
+    nearby_food_drink_options, natural_lighting (comma-separated or repeated values
+    are alternatives). sort is one of name, busyness-asc, busyness-desc, noise-asc,
+    noise-desc; limit caps the result. When any of these is given the response also
+    has "total" (matches before limit) and "facets" (value counts among the matches).
     """
     try:
+        query = _catalog_query()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        include_ratings = "ratings" in request.args.get("include", "").split(",")
+        fmt = stream_format()
+
+        if query is not None:
+            study_spots, total, facets = _filtered_study_spots(get_all_study_spots(), query)
+            if include_ratings:
+                study_spots = _with_ratings(study_spots)
+            if fmt:
+                return stream_response("study_spots", study_spots, fmt)
+            return conditional_json({"study_spots": study_spots, "total": total, "facets": facets})
+
+        # The cached catalog's digest answers revalidation without loading anything
+        version = get_study_spot_catalog_version()
+        if version and not (fmt or include_ratings):
+            cached = not_modified(*version)
+            if cached is None:
+                cached = cached_json("study_spots", version[0], None, *version)
+            if cached is not None:
+                return cached
+
         study_spots = get_all_study_spots()
-        return jsonify({"study_spots": study_spots})
+        if include_ratings:
+            study_spots = _with_ratings(study_spots)
+        if fmt:
+            return stream_response("study_spots", study_spots, fmt)
+
+        etag, last_modified = None, None
+        if not include_ratings:
+            loaded_version = get_study_spot_catalog_version()
+            # Unchanged across the read, so these rows are this version's: encode them once
+            if loaded_version and loaded_version == version:
+                return cached_json("study_spots", version[0], lambda: {"study_spots": study_spots}, *version)
+            etag, last_modified = loaded_version or (None, None)
+        return conditional_json({"study_spots": study_spots}, etag=etag, last_modified=last_modified)
     except Exception as e:
         return jsonify({"error": f"Error fetching study spots: {str(e)}"}), 500
 
 
+@study_spots_bp.route("/study-spots/nearby", methods=["GET"])
+def get_nearby_study_spots_route():
+    """
+    Get the study spots closest to a position, nearest first.
+    Query parameters: lat, lng (required), radius in meters (default 1000, max 50000),
+    limit (default 10, max 50). Each spot includes "distance_m".
+    """
+    lat = request.args.get("lat", type=float)
+    lng = request.args.get("lng", type=float)
+    radius = request.args.get("radius", default=DEFAULT_NEARBY_RADIUS_M, type=float)
+    limit = request.args.get("limit", default=DEFAULT_NEARBY_LIMIT, type=int)
+
+    if lat is None or lng is None or not (-90 <= lat <= 90) or not (-180 <= lng <= 180):
+        return jsonify({"error": "lat and lng must be valid coordinates."}), 400
+    if not (0 < radius <= MAX_NEARBY_RADIUS_M):
+        return jsonify({"error": f"radius must be between 0 and {MAX_NEARBY_RADIUS_M} meters."}), 400
+    if not (1 <= limit <= MAX_NEARBY_LIMIT):
+        return jsonify({"error": f"limit must be an integer between 1 and {MAX_NEARBY_LIMIT}."}), 400
+
+    try:
+        study_spots = get_nearby_study_spots(lat, lng, radius, limit)
+        return jsonify({"study_spots": study_spots})
+    except Exception as e:
+        return jsonify({"error": f"Error fetching nearby study spots: {str(e)}"}), 500
+
+
 @study_spots_bp.route("/study-spots/<int:spot_id>", methods=["GET"])
 def get_study_spot_by_id(spot_id):
     """
     Get a specific study spot by ID.
+    Supports conditional GET via ETag / Last-Modified.
     """
     try:
-        all_spots = get_all_study_spots()
-        spot = next((s for s in all_spots if s.get('id') == spot_id), None)
+        version = get_study_spot_catalog_version()
+        etag, last_modified = None, None
+        if version:
+            etag, last_modified = f"{version[0]}-{spot_id}", version[1]
+            cached = not_modified(etag, last_modified)
+            if cached is not None:
+                return cached
+
+        spot = get_study_spot(spot_id)
         if not spot:
             return jsonify({"error": "Study spot not found"}), 404
-        return jsonify(spot)
+        if version and get_study_spot_catalog_version() == version:
+            return cached_json(f"study_spot:{spot_id}", version[0], lambda: spot, etag, last_modified)
+        return conditional_json(spot, etag=etag, last_modified=last_modified)
     except Exception as e:
         return jsonify({"error": f"Error fetching study spot: {str(e)}"}), 500
 
@@ -128,36 +227,66 @@ def get_study_spot_by_id(spot_id):
 @study_spots_bp.route("/study-spots/recommend", methods=["POST"])
 def recommend_study_spot():
     """
-    Given survey preferences in the request body, return the top 5 matching study spots.
+    Given survey preferences in the request body, return the top matching study spots.
+    The number of results defaults to 5 and can be set with ?k=<n>.
+    Adding "location": {"lat", "lng"} to the body blends in walking distance
+    (see parse_location for the optional "distanceWeight" and "maxDistance").
     """
     preferences = request.get_json(silent=True) or {}
 
     if not preferences:
         return jsonify({"error": "Missing survey preferences in request body."}), 400
+    if not isinstance(preferences, dict):
+        return jsonify({"error": "Survey preferences must be a JSON object."}), 400
+
+    k = _recommendation_count()
+    if k is None:
+        return jsonify({"error": f"k must be an integer between 1 and {MAX_RECOMMENDATIONS}."}), 400
+
+    try:
+        location = parse_location(preferences)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     try:
         spots = get_all_study_spots()
         if not spots:
             return jsonify({"error": "No study spots available to recommend."}), 404
 
-        # Score all spots based on preferences
-        scored_spots = [
-            {**spot, "_match_score": score_study_spot(spot, preferences)}
-            for spot in spots
-        ]
+        if location is None:
+            recommendations = recommend(spots, preferences, k)
+        else:
+            recommendations = recommend_nearby(spots, preferences, location, k)
+
+        return jsonify({"recommended_spots": recommendations})
+    except Exception as e:
+        return jsonify({"error": f"Error generating recommendation: {str(e)}"}), 500
 
-        # Sort by match score (descending)
-        scored_spots.sort(key=lambda s: s["_match_score"], reverse=True)
 
-        # Get top 5 spots (or fewer if there aren't 5 available)
-        top_spots = scored_spots[:5]
+@study_spots_bp.route("/study-spots/recommend/batch", methods=["POST"])
+def recommend_study_spots_batch():
+    """
+    Recommend study spots for a list of survey payloads in one request.
+    Expected JSON body: a list of survey preference objects.
+    Returns one result per payload, in input order; a bad payload gets an
+    "error" entry instead of failing the whole batch.
+    """
+    preferences_list = request.get_json(silent=True)
 
-        # Remove internal _match_score before returning
-        recommendations = [
-            {**{k: v for k, v in spot.items() if k != "_match_score"}, "match_score": spot["_match_score"]}
-            for spot in top_spots
-        ]
+    if not isinstance(preferences_list, list) or not preferences_list:
+        return jsonify({"error": "Request body must be a non-empty list of survey preferences."}), 400
+    if len(preferences_list) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"A batch can contain at most {MAX_BATCH_SIZE} surveys."}), 400
 
-        return jsonify({"recommended_spots": recommendations})
+    k = _recommendation_count()
+    if k is None:
+        return jsonify({"error": f"k must be an integer between 1 and {MAX_RECOMMENDATIONS}."}), 400
+
+    try:
+        spots = get_all_study_spots()
+        if not spots:
+            return jsonify({"error": "No study spots available to recommend."}), 404
+
+        return jsonify({"results": recommend_batch(spots, preferences_list, k)})
     except Exception as e:
-        return jsonify({"error": f"Error generating recommendation: {str(e)}"}), 500
+        return jsonify({"error": f"Error generating recommendations: {str(e)}"}), 500
@@ -0,0 +1,197 @@
+"""
+Async data access for the ASGI app (asgi.py).
+With the MySQL backend and aiomysql installed, queries run on an aiomysql
+connection pool, so a slow query only suspends its own request. Otherwise
+(the SQLite backend, or aiomysql missing) the synchronous service functions
+run in worker threads. Either way the event loop is never blocked on I/O.
+The study spot catalog shares the synchronous services' cache.
+"""
+import asyncio
+import os
+from typing import Any, Dict, List, Optional
+
+import pymysql
+
+from services import database, reviews_backend
+from services.database import DB_CONFIG, _default_pool_size, pin_reads_to_primary, storage_backend, study_spot_cache
+from services.metrics import db_span, span
+from services.review_aggregates import record_review
+from services.reviews_backend import (
+    INSERT_REVIEW_SQL,
+    SELECT_REVIEWS_SQL,
+    SELECT_SPOT_REVIEWS_SQL,
+    TIMESTAMP_FORMAT,
+    validate_review,
+)
+
+try:
+    import aiomysql
+except ImportError:  # optional, blocking calls move to threads without it
+    aiomysql = None
+
+SELECT_STUDY_SPOTS_SQL = "SELECT * FROM UWDialedStudyData"
+SELECT_STUDY_SPOT_SQL = "SELECT * FROM UWDialedStudyData WHERE id = %s"
+
+_pool = None
+_pool_lock: Optional[asyncio.Lock] = None
+
+
+def async_driver_enabled() -> bool:
+    """
+    True if queries go through aiomysql rather than worker threads.
+    """
+    return aiomysql is not None and storage_backend() == "mysql"
+
+
+async def get_async_pool():
+    """
+    Return the aiomysql pool for this process, creating it on first use.
+    """
+    global _pool, _pool_lock
+    if _pool is not None:
+        return _pool
+    if _pool_lock is None:
+        _pool_lock = asyncio.Lock()
+    async with _pool_lock:
+        if _pool is None:
+            _pool = await aiomysql.create_pool(
+                host=DB_CONFIG["host"],
+                user=DB_CONFIG["user"],
+                password=DB_CONFIG["password"],
+                db=DB_CONFIG["database"],
+                minsize=0,
+                maxsize=_default_pool_size(),
+                pool_recycle=float(os.getenv("DB_POOL_MAX_IDLE", "300")),
+                cursorclass=aiomysql.DictCursor,
+                # Otherwise a pooled connection's first SELECT opens a REPEATABLE READ
+                # transaction that is never ended, and its reads never see new rows
+                autocommit=True,
+            )
+        return _pool
+
+
+async def close_async_pool():
+    """
+    Close the pool's connections; the next query builds a new pool.
+    """
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+        await pool.wait_closed()
+
+
+async def _query(query: str, sql: str, params: tuple = (), one: bool = False):
+    pool = await get_async_pool()
+    with span("db.connect"):
+        connection = await pool.acquire()
+    try:
+        async with connection.cursor() as cursor:
+            with db_span(query):
+                await cursor.execute(sql, params)
+                return await cursor.fetchone() if one else list(await cursor.fetchall())
+    finally:
+        pool.release(connection)
+
+
+def _format_timestamps(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    with span("reviews.format"):
+        for row in rows:
+            if row['created_at']:
+                row['created_at'] = row['created_at'].strftime(TIMESTAMP_FORMAT)
+    return rows
+
+
+async def get_all_study_spots() -> List[Dict]:
+    """
+    Async counterpart of services.database.get_all_study_spots().
+    """
+    rows = study_spot_cache.peek()
+    if rows is not None:
+        return rows
+    if not async_driver_enabled():
+        return await asyncio.to_thread(database.get_all_study_spots)
+    try:
+        rows = await _query("study_spots.all", SELECT_STUDY_SPOTS_SQL)
+    except pymysql.Error as err:
+        print(f"Error fetching study spots: {err}")
+        return []
+    study_spot_cache.fill(rows)
+    return list(rows)
+
+
+async def get_study_spot(spot_id: int) -> Optional[Dict]:
+    """
+    Async counterpart of services.database.get_study_spot().
+    """
+    cached, spot = study_spot_cache.lookup(spot_id)
+    if cached:
+        return spot
+    if not async_driver_enabled():
+        return await asyncio.to_thread(database.get_study_spot, spot_id)
+    try:
+        return await _query("study_spots.one", SELECT_STUDY_SPOT_SQL, (spot_id,), one=True)
+    except pymysql.Error as err:
+        print(f"Error fetching study spot {spot_id}: {err}")
+        return None
+
+
+async def get_all_reviews() -> List[Dict[str, Any]]:
+    """
+    Async counterpart of services.reviews_backend.get_all_reviews().
+    """
+    if not async_driver_enabled():
+        return await asyncio.to_thread(reviews_backend.get_all_reviews)
+    try:
+        return _format_timestamps(await _query("reviews.all", SELECT_REVIEWS_SQL))
+    except pymysql.MySQLError as e:
+        print(f"Database error: {e}")
+        return []
+
+
+async def get_reviews_by_study_spot(study_spot_id: int) -> List[Dict[str, Any]]:
+    """
+    Async counterpart of services.reviews_backend.get_reviews_by_study_spot().
+    """
+    if not isinstance(study_spot_id, int) or study_spot_id <= 0:
+        raise ValueError("Study spot ID must be a positive integer.")
+    if not async_driver_enabled():
+        return await asyncio.to_thread(reviews_backend.get_reviews_by_study_spot, study_spot_id)
+    try:
+        return _format_timestamps(await _query("reviews.by_spot", SELECT_SPOT_REVIEWS_SQL, (study_spot_id,)))
+    except pymysql.MySQLError as e:
+        print(f"Database error: {e}")
+        return []
+
+
+async def add_review(study_spot_id: int, name: str, stars: int, review: str) -> Dict[str, Any]:
+    """
+    Async counterpart of services.reviews_backend.add_review().
+    """
+    validate_review(study_spot_id, name, stars, review)
+    if not async_driver_enabled():
+        return await asyncio.to_thread(reviews_backend.add_review, study_spot_id, name, stars, review)
+
+    try:
+        pool = await get_async_pool()
+        with span("db.connect"):
+            connection = await pool.acquire()
+    except pymysql.MySQLError as e:
+        print(f"Database error: {e}")
+        return {"message": "Failed to save review", "error": str(e)}
+
+    try:
+        async with connection.cursor() as cursor:
+            with db_span("reviews.insert"):
+                await cursor.execute(INSERT_REVIEW_SQL, (study_spot_id, name, stars, review))
+        with db_span("reviews.commit"):
+            await connection.commit()
+        pin_reads_to_primary()
+        record_review(study_spot_id, stars)
+        return {"message": "Review added successfully", "status": "success"}
+    except pymysql.MySQLError as e:
+        await connection.rollback()
+        print(f"Database error: {e}")
+        return {"message": "Failed to save review", "error": str(e)}
+    finally:
+        pool.release(connection)
@@ -0,0 +1,84 @@
+"""
+Reuse of structures derived from the study spot catalog (recommendation
+engine, facet and spatial indexes).
+The catalog cache hands out CatalogRows, which carry the content digest of the
+catalog they came from. A CatalogMemo keeps the last structure it built and
+returns it for any rows with the same digest, so reloading an unchanged catalog
+(in this worker or from a new shared snapshot generation) rebuilds nothing.
+Rows without a digest fall back to comparing the row objects themselves.
+"""
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+def catalog_digest(rows: Sequence[Dict[str, Any]]) -> str:
+    """
+    Content hash of a catalog; every process derives the same value for the same rows.
+    """
+    encoded = json.dumps(rows, sort_keys=True, default=str).encode()
+    return hashlib.sha1(encoded).hexdigest()
+
+
+class CatalogRows(list):
+    """
+    Catalog rows tagged with the digest of the catalog they belong to.
+    """
+
+    def __init__(self, rows: Sequence[Dict[str, Any]], digest: Optional[str]):
+        super().__init__(rows)
+        self.digest = digest
+
+
+def catalog_key(spots: Sequence[Dict[str, Any]]) -> Optional[str]:
+    """
+    The digest `spots` was tagged with, or None for plain row lists.
+    """
+    return getattr(spots, "digest", None)
+
+
+class CatalogMemo(Generic[T]):
+    """
+    Holds the single structure built from the most recent catalog.
+    """
+
+    def __init__(self, build: Callable[[Sequence[Dict[str, Any]]], T]):
+        self._build = build
+        # (digest, rows, value), replaced as a whole so readers never need the lock
+        self._entry: Optional[Tuple[Optional[str], List[Dict[str, Any]], T]] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _matches(entry: Tuple[Optional[str], List[Dict[str, Any]], T], spots: Sequence[Dict[str, Any]]) -> bool:
+        digest, rows, _ = entry
+        key = catalog_key(spots)
+        if key is not None and digest is not None:
+            return key == digest
+        return len(spots) == len(rows) and all(a is b for a, b in zip(spots, rows))
+
+    def get(self, spots: Sequence[Dict[str, Any]]) -> T:
+        """
+        Return the structure for `spots`, building it only if the catalog changed.
+        """
+        entry = self._entry
+        if entry is not None and self._matches(entry, spots):
+            return entry[2]
+        with self._lock:
+            entry = self._entry
+            if entry is None or not self._matches(entry, spots):
+                entry = self._entry = (catalog_key(spots), list(spots), self._build(spots))
+            return entry[2]
+
+    def put(self, spots: Sequence[Dict[str, Any]], value: T):
+        """
+        Make `value` the structure returned for `spots` (e.g. one built by another process).
+        """
+        with self._lock:
+            self._entry = (catalog_key(spots), list(spots), value)
+
+    def clear(self):
+        with self._lock:
+            self._entry = None
@@ -0,0 +1,338 @@
+"""
+Study spot catalog snapshot shared by every gunicorn worker.
+With CATALOG_SNAPSHOT_DIR set, the catalog is loaded from the database by one
+process at a time and published as a read-only file. Workers map it into
+memory and reuse it instead of each querying the database. The recommendation
+engine's per-spot column codes are read straight out of the shared mapping
+(no per-worker copy).
+
+Publishing writes a new file and renames it over the old one, so a reader sees
+either the previous generation or the next, never a partial file. Mappings of
+the previous generation stay valid until their last reader drops them.
+
+File layout: HEADER, then compact JSON {"rows": [...], "values": {column: [...]}, "digest": "..."},
+zero padding to a 4-byte boundary, then one little-endian uint32 code per spot for each column
+in PREFERENCE_COLUMNS order.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from services.catalog_memo import CatalogRows, catalog_digest
+from services.metrics import span
+from services.recommendation import PREFERENCE_COLUMN_MAP, RecommendationEngine, use_engine
+
+try:
+    import fcntl
+except ImportError:  # Windows has no flock; every process then refreshes on its own
+    fcntl = None
+
+try:
+    import orjson
+except ImportError:  # optional, the stdlib decoder is used without it
+    orjson = None
+
+SNAPSHOT_FILE = "catalog.snapshot"
+LOCK_FILE = "catalog.lock"
+MAGIC = b"UWDCAT01"
+# magic, generation, created at (unix seconds), JSON length, spot count
+HEADER = struct.Struct("<8sQdQI")
+PREFERENCE_COLUMNS = tuple(PREFERENCE_COLUMN_MAP.values())
+
+
+def snapshot_dir() -> Optional[str]:
+    """
+    The directory holding the shared snapshot, or None when snapshots are off.
+    """
+    return os.getenv("CATALOG_SNAPSHOT_DIR") or None
+
+
+class Snapshot:
+    """
+    One generation of the catalog as attached by this process.
+    """
+
+    def __init__(self, generation: int, created_at: float, rows: CatalogRows,
+                 engine: RecommendationEngine, signature: Tuple[int, int, int]):
+        self.generation = generation
+        self.created_at = created_at
+        self.rows = rows
+        self.engine = engine
+        self.signature = signature
+
+    def age(self) -> float:
+        return time.time() - self.created_at
+
+
+def encode_snapshot(rows: List[Dict[str, Any]], generation: int) -> bytes:
+    """
+    Serialize rows plus the recommendation engine's column encoding and the
+    catalog digest, so every worker keys its derived structures the same way.
+    Values JSON can't represent (Decimal coordinates, datetimes) are stored as
+    strings, the same text the API already sends for them.
+    """
+    values, codes = RecommendationEngine(rows).encoded()
+    document = {"rows": rows, "values": values, "digest": catalog_digest(rows)}
+    body = json.dumps(document, separators=(",", ":"), default=str).encode()
+    code_arrays = [array("I", codes[column]) for column in PREFERENCE_COLUMNS]
+    if sys.byteorder != "little":
+        for column_codes in code_arrays:
+            column_codes.byteswap()
+    return b"".join([
+        HEADER.pack(MAGIC, generation, time.time(), len(body), len(rows)),
+        body,
+        b"\0" * _padding(HEADER.size + len(body)),
+        *(column_codes.tobytes() for column_codes in code_arrays),
+    ])
+
+
+def _padding(offset: int) -> int:
+    # The code arrays start on a 4-byte boundary so they can be cast to uint32 in place
+    return -offset % 4
+
+
+def _signature(stat: os.stat_result) -> Tuple[int, int, int]:
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def read_snapshot(path: str) -> Optional[Snapshot]:
+    """
+    Map the snapshot at `path` and decode it.
+    Returns:
+        The snapshot, or None if there is none or it is not a valid snapshot file
+    """
+    try:
+        with open(path, "rb") as file:
+            signature = _signature(os.fstat(file.fileno()))
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    view = memoryview(mapped)
+    try:
+        magic, generation, created_at, json_length, count = HEADER.unpack_from(view)
+    except struct.error:
+        return None
+    if magic != MAGIC:
+        return None
+
+    start = HEADER.size
+    try:
+        body = view[start:start + json_length]
+        # orjson parses straight out of the mapping; json needs a bytes copy first
+        document = orjson.loads(body) if orjson is not None else json.loads(bytes(body))
+        rows = CatalogRows(document["rows"], document.get("digest") or catalog_digest(document["rows"]))
+    except (ValueError, KeyError, TypeError):  # orjson.JSONDecodeError is a ValueError
+        return None
+    offset = start + json_length
+    offset += _padding(offset)
+    codes = {}
+    for column in PREFERENCE_COLUMNS:
+        column_view = view[offset:offset + 4 * count]
+        # Indexing the mapping directly keeps a single copy for every worker
+        codes[column] = column_view.cast("I") if sys.byteorder == "little" else _swapped(column_view)
+        offset += 4 * count
+    engine = RecommendationEngine.from_encoded(rows, document["values"], codes)
+    return Snapshot(generation, created_at, rows, engine, signature)
+
+
+def _swapped(view: memoryview) -> array:
+    codes = array("I", bytes(view))
+    codes.byteswap()
+    return codes
+
+
+def write_snapshot(directory: str, rows: List[Dict[str, Any]], generation: int) -> str:
+    """
+    Atomically replace the snapshot in `directory` with `rows`.
+    Returns:
+        Path of the published snapshot
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, SNAPSHOT_FILE)
+    data = encode_snapshot(rows, generation)
+    fd, temp_path = tempfile.mkstemp(prefix=SNAPSHOT_FILE + ".", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+    return path
+
+
+@contextmanager
+def refresh_lock(directory: str, blocking: bool) -> Iterator[bool]:
+    """
+    Hold the cross-process refresh lock for `directory`.
+    Yields:
+        True if this process holds the lock, False if another one does (non-blocking only)
+    """
+    if fcntl is None:
+        yield True
+        return
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_FILE), "a+b") as file:
+        try:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
+class SharedCatalog:
+    """
+    Catalog loader backed by the shared snapshot in `directory`.
+    Hand load() to a CatalogCache: it returns the current generation's rows,
+    attaching a new generation only when the file changed. Once the snapshot
+    is `refresh_ahead * max_age` old one process republishes it from the
+    database in the background; past `max_age` the caller refreshes it first.
+    After a failed database load this process doesn't try again for
+    `retry_after` seconds and keeps serving the generation it has.
+    """
+
+    def __init__(self, directory: str, load_rows: Callable[[], Optional[List[Dict]]], max_age: float,
+                 refresh_ahead: float = 0.8, retry_after: float = 5.0):
+        self.directory = directory
+        self.path = os.path.join(directory, SNAPSHOT_FILE)
+        self._load_rows = load_rows
+        self.max_age = max_age
+        self.refresh_ahead = refresh_ahead
+        self.retry_after = retry_after
+        self._failed_at: Optional[float] = None
+        self._snapshot: Optional[Snapshot] = None
+        self._served: Optional[Snapshot] = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._stats = {
+            'attaches': 0,
+            'publishes': 0,
+            'errors': 0,
+        }
+
+    def current(self) -> Optional[Snapshot]:
+        """
+        The latest published generation, attaching it if the file changed since the last call.
+        """
+        try:
+            signature = _signature(os.stat(self.path))
+        except OSError:
+            return self._snapshot
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.signature == signature:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None or self._snapshot.signature != signature:
+                with span("catalog_snapshot.attach"):
+                    attached = read_snapshot(self.path)
+                if attached is not None:
+                    self._snapshot = attached
+                    self._stats['attaches'] += 1
+                    use_engine(attached.rows, attached.engine)
+            return self._snapshot
+
+    def publish(self, blocking: bool = True, force: bool = False) -> Optional[Snapshot]:
+        """
+        Reload the catalog from the database and publish it as the next generation,
+        unless another process published a fresh one while this one waited for the
+        lock (or `force` is set). Skipped while backing off from a failed load,
+        unless `force` is set.
+        Returns:
+            The current snapshot afterwards (None if there still is none)
+        """
+        if not force and self._backing_off():
+            return self.current()
+        with refresh_lock(self.directory, blocking) as acquired:
+            if not acquired:
+                return self.current()
+            snapshot = self.current()
+            if not force and snapshot is not None and snapshot.age() < self.max_age * self.refresh_ahead:
+                return snapshot
+            rows = self._load_rows()
+            if rows is None:
+                self._stats['errors'] += 1
+                self._failed_at = time.monotonic()
+                return snapshot
+            self._failed_at = None
+            with span("catalog_snapshot.publish"):
+                write_snapshot(self.directory, rows, snapshot.generation + 1 if snapshot else 1)
+            self._stats['publishes'] += 1
+        return self.current()
+
+    def _backing_off(self) -> bool:
+        failed_at = self._failed_at
+        return failed_at is not None and time.monotonic() - failed_at < self.retry_after
+
+    def _background_publish(self):
+        try:
+            self.publish(blocking=False)
+        except OSError as err:
+            print(f"Error publishing catalog snapshot: {err}")
+        finally:
+            self._refreshing = False
+
+    def _publish_async(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._background_publish, daemon=True).start()
+
+    def load(self) -> Optional[List[Dict]]:
+        """
+        Rows of the current generation, for use as a CatalogCache loader.
+        Returns:
+            The rows, or None if there is no snapshot and the database could not be read
+        """
+        snapshot = self.current()
+        try:
+            if snapshot is None:
+                snapshot = self.publish(blocking=True)
+            elif snapshot.age() >= self.max_age:
+                # Another process may be refreshing already; its generation is picked up next time
+                snapshot = self.publish(blocking=False)
+            elif snapshot.age() >= self.max_age * self.refresh_ahead:
+                self._publish_async()
+        except OSError as err:
+            print(f"Error publishing catalog snapshot: {err}")
+        if snapshot is None:
+            return None
+        self._served = snapshot
+        return snapshot.rows
+
+    def unchanged(self) -> bool:
+        """
+        True if the file still holds the generation load() last returned and it is
+        not yet due for a refresh, i.e. the caller's rows are current. Costs one stat().
+        """
+        snapshot = self._served
+        if snapshot is None or snapshot.age() >= self.max_age * self.refresh_ahead:
+            return False
+        try:
+            return _signature(os.stat(self.path)) == snapshot.signature
+        except OSError:
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            **self._stats,
+            'generation': snapshot.generation if snapshot else 0,
+            'age': snapshot.age() if snapshot else None,
+            'rows': len(snapshot.rows) if snapshot else 0,
+        }
@@ -0,0 +1,140 @@
+"""
+Facet indexes for filtering and sorting the study spot catalog.
+Each filterable column maps every distinct value to a bitset of catalog
+positions (bit i set = spot i has that value), so a filter is a handful of
+integer ORs and ANDs instead of a scan, and facet counts are popcounts.
+Sort orders are precomputed once per catalog.
+"""
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from services.catalog_memo import CatalogMemo
+
+FACET_COLUMNS = ("busyness_estimate", "noise_level", "power_options", "nearby_food_drink_options", "natural_lighting")
+
+# Same orderings the dashboard offers
+SORT_KEYS = {
+    "name": lambda spot: (spot.get("location") or "").casefold(),
+    "busyness": lambda spot: _busyness(spot) or 0,
+    "noise": lambda spot: (spot.get("noise_level") or "").casefold(),
+}
+SORT_OPTIONS = ("name", "busyness-asc", "busyness-desc", "noise-asc", "noise-desc")
+
+
+def _busyness(spot: Dict[str, Any]) -> Optional[int]:
+    try:
+        return int(spot.get("busyness_estimate"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _popcount(bits: int) -> int:
+    return bin(bits).count("1")
+
+
+def _set_positions(flags: str) -> Iterator[int]:
+    """
+    Positions of the "1"s in a least-significant-first bit string.
+    """
+    i = flags.find("1")
+    while i != -1:
+        yield i
+        i = flags.find("1", i + 1)
+
+
+class FacetIndex:
+    """
+    Per-column value -> bitset indexes and precomputed sort orders over a catalog.
+    """
+
+    def __init__(self, spots: Sequence[Dict[str, Any]]):
+        self.spots = list(spots)
+        self.all_bits = (1 << len(self.spots)) - 1
+        self._bitsets: Dict[str, Dict[Any, int]] = {column: {} for column in FACET_COLUMNS}
+        for i, spot in enumerate(self.spots):
+            for column in FACET_COLUMNS:
+                value = _busyness(spot) if column == "busyness_estimate" else spot.get(column)
+                if value is None or value == "":
+                    continue
+                bitsets = self._bitsets[column]
+                bitsets[value] = bitsets.get(value, 0) | (1 << i)
+        # Built with reverse= rather than reversed() so ties keep catalog order both ways
+        self._orders = {}
+        for name, key in SORT_KEYS.items():
+            for direction in ("asc", "desc"):
+                self._orders[f"{name}-{direction}"] = sorted(
+                    range(len(self.spots)), key=lambda i, key=key: key(self.spots[i]), reverse=direction == "desc"
+                )
+        self._orders["name"] = self._orders.pop("name-asc")
+        del self._orders["name-desc"]
+
+    def select(
+        self,
+        equals: Optional[Dict[str, Iterable[Any]]] = None,
+        busyness_min: Optional[int] = None,
+        busyness_max: Optional[int] = None,
+    ) -> int:
+        """
+        Return the bitset of spots matching every column filter. Values within one
+        column are alternatives (OR); different columns must all match (AND).
+        """
+        bits = self.all_bits
+        for column, values in (equals or {}).items():
+            bitsets = self._bitsets[column]
+            column_bits = 0
+            for value in values:
+                column_bits |= bitsets.get(value, 0)
+            bits &= column_bits
+        if busyness_min is not None or busyness_max is not None:
+            column_bits = 0
+            for value, value_bits in self._bitsets["busyness_estimate"].items():
+                if (busyness_min is None or value >= busyness_min) and (busyness_max is None or value <= busyness_max):
+                    column_bits |= value_bits
+            bits &= column_bits
+        return bits
+
+    def count(self, bits: int) -> int:
+        return _popcount(bits)
+
+    def facet_counts(self, bits: int) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        For each column, how many of the selected spots have each value.
+        """
+        facets = {}
+        for column, bitsets in self._bitsets.items():
+            counts = [
+                {"value": value, "count": _popcount(bits & value_bits)}
+                for value, value_bits in bitsets.items()
+            ]
+            facets[column] = sorted(
+                (c for c in counts if c["count"]),
+                key=lambda c: (-c["count"], str(c["value"])),
+            )
+        return facets
+
+    def ordered(self, bits: int, sort: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        The selected spots in catalog order or in one of SORT_OPTIONS, at most `limit`.
+        """
+        # Decode the set bits once; testing `bits >> i & 1` per position is quadratic
+        flags = bin(bits)[:1:-1]
+        if sort:
+            selected = (i for i in self._orders[sort] if i < len(flags) and flags[i] == "1")
+        else:
+            selected = _set_positions(flags)
+
+        results = []
+        for i in selected:
+            results.append(self.spots[i])
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+
+_indexes: CatalogMemo[FacetIndex] = CatalogMemo(FacetIndex)
+
+
+def get_facet_index(spots: Sequence[Dict[str, Any]]) -> FacetIndex:
+    """
+    Return a facet index for `spots`, reusing the last one while the catalog is unchanged.
+    """
+    return _indexes.get(spots)
@@ -0,0 +1,206 @@
+"""
+Timing spans and Prometheus metrics.
+span() times a block of work: it feeds a process-wide latency histogram and,
+during a request, the per-request breakdown the app sends as Server-Timing.
+db_span() also counts the query. render_metrics() produces the Prometheus
+text exposition format for every metric registered here.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; spans from sub-millisecond cache hits up to slow full-table reads
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry: List["_Metric"] = []
+# name -> [total seconds, calls] for the request being served in this context
+_request_timings: contextvars.ContextVar[Optional[Dict[str, List[float]]]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in values
+        ]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, description, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            series = self._values.get(self._key(labels))
+            return int(series[-2]) if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((key, list(series)) for key, series in self._values.items())
+        lines = self.header()
+        for key, series in values:
+            bounds = [_number(bound) for bound in self.buckets] + ["+Inf"]
+            for bound, count in zip(bounds, series):
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {count}")
+            labels = _labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {series[-2]}")
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+REQUEST_DURATION = Histogram(
+    "uwdialed_http_request_duration_seconds", "Time spent handling HTTP requests.", ("method", "route", "status"))
+SPAN_DURATION = Histogram(
+    "uwdialed_span_duration_seconds", "Time spent in instrumented phases of request handling.", ("span",))
+DB_QUERIES = Counter("uwdialed_db_queries_total", "Database queries issued.", ("query",))
+DB_ERRORS = Counter("uwdialed_db_query_errors_total", "Database queries that raised an error.", ("query",))
+DB_READS = Counter("uwdialed_db_read_connections_total", "Read connections checked out, per replica or primary.", ("target",))
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """
+    Time the enclosed block as `name`.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        SPAN_DURATION.observe(elapsed, span=name)
+        timings = _request_timings.get()
+        if timings is not None:
+            entry = timings.setdefault(name, [0.0, 0])
+            entry[0] += elapsed
+            entry[1] += 1
+
+
+@contextmanager
+def db_span(query: str) -> Iterator[None]:
+    """
+    Time and count one database query (execute plus fetch) as span "db.<query>".
+    """
+    DB_QUERIES.inc(query=query)
+    try:
+        with span(f"db.{query}"):
+            yield
+    except Exception:
+        DB_ERRORS.inc(query=query)
+        raise
+
+
+def start_request_timing() -> contextvars.Token:
+    """
+    Begin collecting spans for the current request. Pass the result to
+    finish_request_timing().
+    """
+    return _request_timings.set({})
+
+
+def request_timings() -> Dict[str, Tuple[float, int]]:
+    """
+    Spans recorded so far for the current request: name -> (seconds, calls).
+    """
+    timings = _request_timings.get() or {}
+    return {name: (entry[0], entry[1]) for name, entry in timings.items()}
+
+
+def finish_request_timing(token: contextvars.Token):
+    _request_timings.reset(token)
+
+
+def render_metrics() -> str:
+    """
+    Every registered metric in Prometheus text exposition format.
+    """
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def reset_metrics():
+    """
+    Zero every registered metric.
+    """
+    for metric in _registry:
+        metric.clear()
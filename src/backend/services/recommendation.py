@@ -0,0 +1,553 @@
+"""
+Recommendation scoring for study spots.
+score_study_spot() is the reference scorer for a single spot. RecommendationEngine
+encodes a catalog once and scores every spot against a survey payload in one pass.
+"""
+import heapq
+import math
+import os
+import threading
+from collections import OrderedDict
+from itertools import product
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from services.catalog_memo import CatalogMemo, catalog_key
+from services.metrics import span
+from services.spatial import get_spatial_index
+
+BUSYNESS_MAP = {
+    "very quiet": 1,
+    "quiet": 2,
+    "moderate": 3,
+    "busy/active": 4,
+    "loud": 5,
+}
+
+POWER_MAP = {
+    "essential": {"Y": 2, "Limited": 1, "N": 0},
+    "helpful but not required": {"Y": 2, "Limited": 1, "N": 0},
+    "not important": {"Y": 1, "Limited": 1, "N": 1},
+}
+
+LIGHTING_MAP = {
+    "bright natural light": "Well",
+    "some natural light": "Yes",
+    "low/no natural light": "No",
+}
+
+# Maps survey preference keys to columns that exist in UWDialedStudyData.
+# Only attributes represented in the database are included here.
+PREFERENCE_COLUMN_MAP = {
+    "busyness": "busyness_estimate",
+    "powerAccess": "power_options",
+    "foodPreference": "nearby_food_drink_options",
+    "noiseLevel": "noise_level",
+    "lighting": "natural_lighting",
+}
+
+
+def score_study_spot(spot, preferences):
+    """
+    Return a numeric score that represents how well `spot` matches `preferences`.
+    """
+    score = 0
+
+    for pref_key, column_key in PREFERENCE_COLUMN_MAP.items():
+        pref_value = preferences.get(pref_key)
+        if not pref_value or pref_value.lower() == "no preference":
+            continue
+
+        spot_value = spot.get(column_key)
+        if not spot_value:
+            continue
+
+        # Normalize strings for comparison
+        if column_key == "busyness_estimate":
+            desired = BUSYNESS_MAP.get(pref_value.lower())
+            try:
+                spot_busyness = int(spot_value)
+            except (TypeError, ValueError):
+                spot_busyness = None
+            if desired is not None and spot_busyness is not None:
+                score += max(0, 3 - abs(spot_busyness - desired))
+            continue
+
+        if column_key == "power_options":
+            power_scores = POWER_MAP.get(pref_value.lower())
+            if power_scores:
+                score += power_scores.get(spot_value, 0)
+            continue
+
+        if column_key == "nearby_food_drink_options":
+            if pref_value.lower() in spot_value.lower():
+                score += 2
+            elif pref_value.lower() == "no preference":
+                score += 1
+            continue
+
+        if column_key == "noise_level":
+            if pref_value.lower() in spot_value.lower():
+                score += 2
+            continue
+
+        if column_key == "natural_lighting":
+            mapped_pref = LIGHTING_MAP.get(pref_value.lower())
+            if mapped_pref and mapped_pref.lower() in spot_value.lower():
+                score += 2
+            continue
+
+    return score
+
+
+# Free-text survey answers offered by the frontend, used to enumerate the
+# preference space when precomputing recommendations
+FOOD_PREFERENCES = ("coffee shops", "quick snacks", "full meals", "vending machines")
+NOISE_PREFERENCES = (
+    "silent",
+    "low background noise",
+    "moderate conversational noise",
+    "lively café-like noise",
+)
+
+NO_PREFERENCE = "no preference"
+DEFAULT_RECOMMENDATIONS = 5
+MAX_RECOMMENDATIONS = 50
+MAX_BATCH_SIZE = 1000
+TEXT_MATCH_POINTS = 2
+
+# Location-aware ranking: points subtracted per kilometre of walking, and the
+# default search radius beyond which spots are not considered at all
+DEFAULT_DISTANCE_WEIGHT = 2.0
+DEFAULT_MAX_DISTANCE_M = 2000.0
+MAX_DISTANCE_M = 50000.0
+
+
+def _as_int(value) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _lowered(value):
+    return value.lower() if isinstance(value, str) else value
+
+
+class RecommendationEngine:
+    """
+    Column-encoded copy of a study spot catalog.
+    Each preference column is stored as a list of distinct values plus one code
+    per spot. Scoring a survey compiles it into a points table per column (one
+    entry per distinct value), then sums table lookups across all spots at once.
+    Scores match score_study_spot() exactly.
+    """
+
+    def __init__(self, spots: Sequence[Dict[str, Any]]):
+        self.spots = list(spots)
+        self._values: Dict[str, List[Any]] = {}
+        self._codes: Dict[str, List[int]] = {}
+        for column_key in PREFERENCE_COLUMN_MAP.values():
+            values: List[Any] = []
+            seen: Dict[Any, int] = {}
+            codes = []
+            for spot in self.spots:
+                value = spot.get(column_key)
+                code = seen.get(value)
+                if code is None:
+                    code = seen[value] = len(values)
+                    values.append(value)
+                codes.append(code)
+            self._values[column_key] = values
+            self._codes[column_key] = codes
+        self._decode()
+
+    @classmethod
+    def from_encoded(cls, spots: Sequence[Dict[str, Any]], values: Dict[str, List[Any]],
+                     codes: Dict[str, Sequence[int]]) -> "RecommendationEngine":
+        """
+        Build an engine from columns encoded elsewhere, e.g. by encoded() in
+        another process. `codes` may be any int sequence, such as a memoryview
+        over a shared catalog snapshot.
+        """
+        engine = cls.__new__(cls)
+        engine.spots = list(spots)
+        engine._values = values
+        engine._codes = codes
+        engine._decode()
+        return engine
+
+    def encoded(self) -> Tuple[Dict[str, List[Any]], Dict[str, List[int]]]:
+        """
+        The distinct values and per-spot codes of every preference column.
+        """
+        return self._values, self._codes
+
+    def _decode(self):
+        # Decode once: busyness as int, text columns lowercased for substring matching
+        self._busyness = [_as_int(v) for v in self._values["busyness_estimate"]]
+        self._lowered = {
+            column_key: [_lowered(v) for v in self._values[column_key]]
+            for column_key in ("nearby_food_drink_options", "noise_level", "natural_lighting")
+        }
+
+    def _column_table(self, column_key: str, pref: str) -> Optional[List[int]]:
+        values = self._values[column_key]
+
+        if column_key == "busyness_estimate":
+            desired = BUSYNESS_MAP.get(pref)
+            if desired is None:
+                return None
+            return [
+                max(0, 3 - abs(busyness - desired)) if raw and busyness is not None else 0
+                for raw, busyness in zip(values, self._busyness)
+            ]
+
+        if column_key == "power_options":
+            power_scores = POWER_MAP.get(pref)
+            if not power_scores:
+                return None
+            return [power_scores.get(raw, 0) if raw else 0 for raw in values]
+
+        if column_key == "natural_lighting":
+            mapped_pref = LIGHTING_MAP.get(pref)
+            if not mapped_pref:
+                return None
+            pref = mapped_pref.lower()
+
+        return [
+            TEXT_MATCH_POINTS if raw and pref in lowered else 0
+            for raw, lowered in zip(values, self._lowered[column_key])
+        ]
+
+    def compile(self, preferences: Dict[str, Any]) -> List[Tuple[List[int], List[int]]]:
+        """
+        Turn a survey payload into (points table, spot codes) pairs, one per
+        column that can contribute to the score.
+        """
+        compiled = []
+        for pref_key, column_key in PREFERENCE_COLUMN_MAP.items():
+            pref_value = preferences.get(pref_key)
+            if not pref_value:
+                continue
+            pref = pref_value.lower()
+            if pref == NO_PREFERENCE:
+                continue
+            table = self._column_table(column_key, pref)
+            if table and any(table):
+                compiled.append((table, self._codes[column_key]))
+        return compiled
+
+    def score(self, preferences: Dict[str, Any]) -> List[int]:
+        """
+        Score every spot in the catalog, in catalog order.
+        """
+        with span("score"):
+            scores = [0] * len(self.spots)
+            for table, codes in self.compile(preferences):
+                scores = [score + table[code] for score, code in zip(scores, codes)]
+            return scores
+
+    def score_positions(self, preferences: Dict[str, Any], positions: Sequence[int]) -> List[int]:
+        """
+        Score only the spots at `positions` in the catalog, in the given order.
+        """
+        with span("score"):
+            scores = [0] * len(positions)
+            for table, codes in self.compile(preferences):
+                scores = [score + table[codes[i]] for score, i in zip(scores, positions)]
+            return scores
+
+
+def _build_engine(spots: Sequence[Dict[str, Any]]) -> RecommendationEngine:
+    with span("score.encode_catalog"):
+        return RecommendationEngine(spots)
+
+
+_engines: CatalogMemo[RecommendationEngine] = CatalogMemo(_build_engine)
+
+
+def get_engine(spots: Sequence[Dict[str, Any]]) -> RecommendationEngine:
+    """
+    Return an engine for `spots`, reusing the last one while the catalog is unchanged.
+    """
+    return _engines.get(spots)
+
+
+def use_engine(spots: Sequence[Dict[str, Any]], engine: RecommendationEngine):
+    """
+    Make `engine` the one get_engine() returns for the catalog `spots` belongs to.
+    """
+    _engines.put(spots, engine)
+
+
+def score_study_spots(spots: Sequence[Dict[str, Any]], preferences: Dict[str, Any]) -> List[int]:
+    """
+    Score every spot in `spots` against `preferences`.
+    Returns:
+        List of scores in the same order as `spots`
+    """
+    return get_engine(spots).score(preferences)
+
+
+def _rank_key(spots: Sequence[Dict[str, Any]], scores: Sequence[int], index: int):
+    # Highest score first, ties broken by ascending id, then catalog position
+    spot_id = spots[index].get("id")
+    return (-scores[index], spot_id is None, spot_id if spot_id is not None else 0, index)
+
+
+def top_k(spots: Sequence[Dict[str, Any]], scores: Sequence[int], k: int) -> List[int]:
+    """
+    Return the positions of the `k` best scoring spots without sorting the whole catalog.
+    """
+    return heapq.nsmallest(k, range(len(spots)), key=lambda i: _rank_key(spots, scores, i))
+
+
+def canonical_preferences(preferences: Dict[str, Any]) -> Tuple[Optional[str], ...]:
+    """
+    Reduce a survey payload to the values that can affect its score.
+    Answers are lowercased, and "no preference" or answers the scorer ignores
+    become None, so equivalent payloads share one key.
+    """
+    enumerated = {
+        "busyness_estimate": BUSYNESS_MAP,
+        "power_options": POWER_MAP,
+        "natural_lighting": LIGHTING_MAP,
+    }
+    key = []
+    for pref_key, column_key in PREFERENCE_COLUMN_MAP.items():
+        value = preferences.get(pref_key)
+        value = value.lower() if value else None
+        if value == NO_PREFERENCE:
+            value = None
+        if column_key in enumerated and value not in enumerated[column_key]:
+            value = None
+        key.append(value)
+    return tuple(key)
+
+
+def _preferences_from_key(key: Tuple[Optional[str], ...]) -> Dict[str, str]:
+    return {pref_key: value for pref_key, value in zip(PREFERENCE_COLUMN_MAP, key) if value}
+
+
+class RecommendationCache:
+    """
+    LRU cache of ranked recommendations keyed by canonical survey preferences.
+    Each entry holds the catalog positions and scores of the best
+    MAX_RECOMMENDATIONS spots, so any k is a slice; only the k returned spots
+    are copied into dicts. Entries are dropped as soon as the catalog changes,
+    identified by its digest (or by the engine, for untagged row lists).
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._entries: "OrderedDict[Tuple, Tuple[Tuple[int, ...], Tuple[int, ...]]]" = OrderedDict()
+        self._catalog: Any = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'invalidations': 0,
+        }
+
+    def _rank(self, engine: RecommendationEngine, key: Tuple) -> Tuple[Tuple[int, ...], Tuple[int, ...]]:
+        scores = engine.score(_preferences_from_key(key))
+        positions = tuple(top_k(engine.spots, scores, MAX_RECOMMENDATIONS))
+        return positions, tuple(scores[i] for i in positions)
+
+    @staticmethod
+    def _materialize(engine: RecommendationEngine, ranked: Tuple[Tuple[int, ...], Tuple[int, ...]],
+                     k: int) -> List[Dict[str, Any]]:
+        positions, scores = ranked
+        return [{**engine.spots[i], "match_score": score} for i, score in zip(positions[:k], scores[:k])]
+
+    def _sync_catalog_locked(self, catalog: Any):
+        if self._catalog != catalog:
+            if self._entries:
+                self._stats['invalidations'] += 1
+            self._entries.clear()
+            self._catalog = catalog
+
+    def get(self, spots: Sequence[Dict[str, Any]], preferences: Dict[str, Any], k: int) -> List[Dict[str, Any]]:
+        """
+        Return the top `k` recommendations, ranking only on a cache miss.
+        """
+        engine = get_engine(spots)
+        catalog = catalog_key(spots) or engine
+        key = canonical_preferences(preferences)
+        with self._lock:
+            self._sync_catalog_locked(catalog)
+            ranked = self._entries.get(key)
+            if ranked is not None:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return self._materialize(engine, ranked, k)
+            self._stats['misses'] += 1
+
+        ranked = self._rank(engine, key)
+        with self._lock:
+            if self._catalog == catalog and self.capacity > 0:
+                self._entries[key] = ranked
+                while len(self._entries) > self.capacity:
+                    self._entries.popitem(last=False)
+                    self._stats['evictions'] += 1
+        return self._materialize(engine, ranked, k)
+
+    def precompute(self, spots: Sequence[Dict[str, Any]]) -> int:
+        """
+        Rank every combination of survey answers so later requests are lookups.
+        Returns:
+            Number of combinations ranked
+        """
+        choices = (
+            [None, *BUSYNESS_MAP],
+            [None, *POWER_MAP],
+            [None, *FOOD_PREFERENCES],
+            [None, *NOISE_PREFERENCES],
+            [None, *LIGHTING_MAP],
+        )
+        count = 0
+        for combination in product(*choices):
+            self.get(spots, _preferences_from_key(combination), 1)
+            count += 1
+        return count
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._catalog = None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, 'size': len(self._entries), 'capacity': self.capacity}
+
+
+recommendation_cache = RecommendationCache(int(os.getenv('RECOMMENDATION_CACHE_SIZE', '4096')))
+
+
+def recommend(
+    spots: Sequence[Dict[str, Any]],
+    preferences: Dict[str, Any],
+    k: int = DEFAULT_RECOMMENDATIONS,
+) -> List[Dict[str, Any]]:
+    """
+    Return the top `k` spots for `preferences` with their match scores.
+    Results are memoized per canonical preference set until the catalog changes.
+    """
+    return recommendation_cache.get(spots, preferences, k)
+
+
+def parse_location(preferences: Dict[str, Any]) -> Optional[Dict[str, float]]:
+    """
+    Read the optional position fields from a survey payload:
+    "location": {"lat": float, "lng": float}, "distanceWeight" (points per km)
+    and "maxDistance" (meters).
+    Returns:
+        {"lat", "lng", "distance_weight", "max_distance_m"}, or None if no location was given
+    Raises:
+        ValueError if the location fields are malformed
+    """
+    location = preferences.get("location")
+    if location is None:
+        return None
+    try:
+        lat, lng = float(location["lat"]), float(location["lng"])
+        distance_weight = float(preferences.get("distanceWeight", DEFAULT_DISTANCE_WEIGHT))
+        max_distance_m = float(preferences.get("maxDistance", DEFAULT_MAX_DISTANCE_M))
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("location must be an object with numeric lat and lng.")
+    # float() accepts "nan" and "inf"; NaN would slip past every range check below
+    if not all(math.isfinite(value) for value in (lat, lng, distance_weight, max_distance_m)):
+        raise ValueError("location, distanceWeight and maxDistance must be finite numbers.")
+    if not (-90 <= lat <= 90) or not (-180 <= lng <= 180):
+        raise ValueError("location must be a valid latitude and longitude.")
+    if distance_weight < 0:
+        raise ValueError("distanceWeight cannot be negative.")
+    if not (0 < max_distance_m <= MAX_DISTANCE_M):
+        raise ValueError(f"maxDistance must be between 0 and {int(MAX_DISTANCE_M)} meters.")
+    return {"lat": lat, "lng": lng, "distance_weight": distance_weight, "max_distance_m": max_distance_m}
+
+
+def recommend_nearby(
+    spots: Sequence[Dict[str, Any]],
+    preferences: Dict[str, Any],
+    location: Dict[str, float],
+    k: int = DEFAULT_RECOMMENDATIONS,
+) -> List[Dict[str, Any]]:
+    """
+    Rank spots by match score minus `distance_weight` points per kilometre from
+    the student's position. Spots beyond `max_distance_m` are pruned with the
+    spatial index before any scoring happens.
+    Returns:
+        Top `k` spots with "match_score", "distance_m" and "combined_score"
+    """
+    nearby = get_spatial_index(spots).nearby(location["lat"], location["lng"], location["max_distance_m"])
+    if not nearby:
+        return []
+    positions = [i for i, _ in nearby]
+    scores = get_engine(spots).score_positions(preferences, positions)
+
+    weight = location["distance_weight"]
+    ranked = heapq.nsmallest(
+        k,
+        zip(scores, nearby),
+        key=lambda item: (-(item[0] - weight * item[1][1] / 1000), spots[item[1][0]].get("id") or 0),
+    )
+    return [
+        {
+            **spots[i],
+            "match_score": score,
+            "distance_m": round(distance, 1),
+            "combined_score": round(score - weight * distance / 1000, 3),
+        }
+        for score, (i, distance) in ranked
+    ]
+
+
+def recommend_batch(
+    spots: Sequence[Dict[str, Any]],
+    preferences_list: Sequence[Any],
+    k: int = DEFAULT_RECOMMENDATIONS,
+) -> List[Dict[str, Any]]:
+    """
+    Recommend spots for many survey payloads against one catalog snapshot.
+    Payloads with the same canonical preferences are ranked once.
+    Returns:
+        One result per payload, in input order: {"recommended_spots": [...]} or {"error": str}
+    """
+    results = []
+    for preferences in preferences_list:
+        if not isinstance(preferences, dict) or not preferences:
+            results.append({"error": "Missing survey preferences."})
+            continue
+        try:
+            location = parse_location(preferences)
+            if location is None:
+                results.append({"recommended_spots": recommend(spots, preferences, k)})
+            else:
+                results.append({"recommended_spots": recommend_nearby(spots, preferences, location, k)})
+        except ValueError as e:
+            results.append({"error": str(e)})
+        except Exception as e:
+            results.append({"error": f"Error generating recommendation: {str(e)}"})
+    return results
+
+
+def precompute_recommendations(load_spots: Callable[[], List[Dict[str, Any]]]):
+    """
+    Fill the recommendation cache for every survey combination on a background thread.
+    """
+    def run():
+        spots = load_spots()
+        if spots:
+            count = recommendation_cache.precompute(spots)
+            print(f"Precomputed recommendations for {count} preference combinations")
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def get_recommendation_cache_stats() -> Dict[str, int]:
+    """
+    Return hit/miss statistics for the recommendation cache.
+    """
+    return recommendation_cache.stats()
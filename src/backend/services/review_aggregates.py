@@ -0,0 +1,157 @@
+"""
+Per-study-spot review aggregates: review count, star total and a 1-5 star histogram.
+The aggregates are rebuilt from the reviews table with one GROUP BY query and
+updated in place whenever this process saves a review, so a spot's rating
+summary never requires reading its reviews.
+"""
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import pymysql
+
+from services.database import get_db_connection
+from services.metrics import db_span
+
+STAR_VALUES = (1, 2, 3, 4, 5)
+
+
+def _summary(study_spot_id: int, histogram: List[int]) -> Dict[str, Any]:
+    count = sum(histogram)
+    star_total = sum(stars * n for stars, n in zip(STAR_VALUES, histogram))
+    return {
+        "studySpotId": study_spot_id,
+        "count": count,
+        "star_total": star_total,
+        "average": round(star_total / count, 2) if count else None,
+        "histogram": {str(stars): n for stars, n in zip(STAR_VALUES, histogram)},
+    }
+
+
+class ReviewAggregates:
+    """
+    In-memory star histograms per study spot.
+    Reviews saved by other gunicorn workers show up at the next rebuild, which
+    happens on the first read after `ttl` seconds.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._histograms: Dict[int, List[int]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+
+    def rebuild(self) -> bool:
+        """
+        Recompute every histogram from the reviews table.
+        Returns:
+            True if the aggregates were rebuilt, False if the database could not be read
+        """
+        connection = get_db_connection(read_only=True)
+        if not connection:
+            return False
+        try:
+            with connection.cursor() as cursor:
+                sql = "SELECT studySpotId, stars, COUNT(*) AS n FROM reviews GROUP BY studySpotId, stars"
+                with db_span("reviews.aggregates"):
+                    cursor.execute(sql)
+                    rows = cursor.fetchall()
+        except pymysql.MySQLError as e:
+            print(f"Database error while rebuilding review aggregates: {e}")
+            return False
+        finally:
+            connection.close()
+
+        histograms: Dict[int, List[int]] = {}
+        for row in rows:
+            if row['stars'] in STAR_VALUES:
+                histograms.setdefault(row['studySpotId'], [0] * len(STAR_VALUES))[row['stars'] - 1] = row['n']
+        with self._lock:
+            self._histograms = histograms
+            self._loaded_at = time.monotonic()
+        return True
+
+    def _ensure_fresh(self) -> bool:
+        loaded_at = self._loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at < self.ttl:
+            return True
+        with self._rebuild_lock:
+            loaded_at = self._loaded_at
+            if loaded_at is not None and time.monotonic() - loaded_at < self.ttl:
+                return True
+            # Fall back to the previous aggregates if the rebuild fails
+            return self.rebuild() or self._loaded_at is not None
+
+    def record(self, study_spot_id: int, stars: int):
+        """
+        Count a newly saved review. Ignored until the aggregates have been built,
+        since the first rebuild will include it.
+        """
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            self._histograms.setdefault(study_spot_id, [0] * len(STAR_VALUES))[stars - 1] += 1
+
+    def summary(self, study_spot_id: int) -> Optional[Dict[str, Any]]:
+        if not self._ensure_fresh():
+            return None
+        with self._lock:
+            histogram = list(self._histograms.get(study_spot_id, [0] * len(STAR_VALUES)))
+        return _summary(study_spot_id, histogram)
+
+    def summaries(self, study_spot_ids: Optional[Iterable[int]] = None) -> Optional[Dict[int, Dict[str, Any]]]:
+        if not self._ensure_fresh():
+            return None
+        with self._lock:
+            if study_spot_ids is None:
+                histograms = {k: list(v) for k, v in self._histograms.items()}
+            else:
+                empty = [0] * len(STAR_VALUES)
+                histograms = {k: list(self._histograms.get(k, empty)) for k in study_spot_ids}
+        return {k: _summary(k, v) for k, v in histograms.items()}
+
+    def invalidate(self):
+        with self._lock:
+            self._histograms = {}
+            self._loaded_at = None
+
+
+review_aggregates = ReviewAggregates(ttl=float(os.getenv('REVIEW_AGGREGATES_TTL', '60')))
+
+
+def get_review_summary(study_spot_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Return the rating summary for one study spot.
+    Returns:
+        {"studySpotId", "count", "star_total", "average", "histogram"}, or None if
+        the aggregates could not be loaded
+    """
+    if not isinstance(study_spot_id, int) or study_spot_id <= 0:
+        raise ValueError("Study spot ID must be a positive integer.")
+    return review_aggregates.summary(study_spot_id)
+
+
+def get_review_summaries(study_spot_ids: Optional[Iterable[int]] = None) -> Optional[Dict[int, Dict[str, Any]]]:
+    """
+    Return rating summaries keyed by study spot ID, for the given spots (including
+    ones with no reviews) or for every spot that has reviews.
+    Returns:
+        Dict of summaries, or None if the aggregates could not be loaded
+    """
+    return review_aggregates.summaries(study_spot_ids)
+
+
+def record_review(study_spot_id: int, stars: int):
+    """
+    Fold a newly saved review into the aggregates.
+    """
+    review_aggregates.record(study_spot_id, stars)
+
+
+def rebuild_review_aggregates() -> bool:
+    """
+    Recompute all aggregates from the reviews table.
+    """
+    return review_aggregates.rebuild()
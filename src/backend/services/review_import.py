@@ -0,0 +1,166 @@
+"""
+Bulk review import from JSON, NDJSON or CSV.
+Rows are validated with the same rules as add_review() and saved in chunked
+transactions; rows that fail are reported individually instead of aborting
+the import.
+
+Command line usage (from src/backend):
+    python -m services.review_import reviews.csv [--format csv] [--chunk-size 1000]
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from services.reviews_backend import add_reviews, add_reviews_isolating, validate_review
+
+REQUIRED_FIELDS = ("studySpotId", "name", "stars", "review")
+IMPORT_FORMATS = ("json", "ndjson", "csv")
+DEFAULT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+
+def detect_format(filename: Optional[str] = None, content_type: Optional[str] = None) -> str:
+    """
+    Guess the import format from a file extension or content type, defaulting to JSON.
+    """
+    name = (filename or "").lower()
+    mimetype = (content_type or "").split(";")[0].strip().lower()
+    if name.endswith((".ndjson", ".jsonl")) or mimetype in ("application/x-ndjson", "application/jsonl"):
+        return "ndjson"
+    if name.endswith(".csv") or mimetype == "text/csv":
+        return "csv"
+    return "json"
+
+
+def parse_reviews(stream: TextIO, fmt: str) -> Iterator[Any]:
+    """
+    Yield raw review records from a text stream. NDJSON and CSV are read line by line.
+    Raises:
+        ValueError if the input cannot be parsed at all
+    """
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+    if fmt == "json":
+        try:
+            records = json.load(stream)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {e}")
+        if not isinstance(records, list):
+            raise ValueError("JSON import must be an array of reviews.")
+        yield from records
+        return
+
+    if fmt == "ndjson":
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                # Report the line as a failed row rather than abandoning the import
+                yield ValueError(f"Invalid JSON line: {e}")
+        return
+
+    for record in csv.DictReader(stream):
+        # CSV has no types, so numeric columns are converted before validation
+        for field in ("studySpotId", "stars"):
+            value = (record.get(field) or "").strip()
+            if value.lstrip("-").isdigit():
+                record[field] = int(value)
+        yield record
+
+
+def _to_row(record: Any) -> Tuple[int, str, int, str]:
+    if isinstance(record, Exception):
+        raise record
+    if not isinstance(record, dict):
+        raise ValueError("Review must be an object.")
+    for field in REQUIRED_FIELDS:
+        if field not in record:
+            raise ValueError(f"Missing required field: {field}")
+    row = (record["studySpotId"], record["name"], record["stars"], record["review"])
+    validate_review(*row)
+    return row
+
+
+class _ImportResult:
+    def __init__(self):
+        self.inserted = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.failed = 0
+
+    def fail(self, row_number: int, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_number, "error": message})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+def _save_chunk(chunk: List[Tuple[int, Tuple]], result: _ImportResult):
+    # A failed chunk is rolled back and retried row by row to find the rows the database rejects
+    result.inserted += add_reviews_isolating(
+        chunk, lambda row_number, e: result.fail(row_number, f"Database error: {e}"), save=add_reviews
+    )
+
+
+def import_reviews(records: Iterable[Any], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    Validate and save review records, `chunk_size` rows per transaction.
+    Returns:
+        {"inserted": int, "failed": int, "errors": [{"row": n, "error": str}], "errors_truncated": bool}
+        Row numbers are 1-based positions in the input.
+    """
+    if chunk_size < 1:
+        raise ValueError("Chunk size must be a positive integer.")
+
+    result = _ImportResult()
+    chunk: List[Tuple[int, Tuple]] = []
+    for row_number, record in enumerate(records, start=1):
+        try:
+            chunk.append((row_number, _to_row(record)))
+        except ValueError as e:
+            result.fail(row_number, str(e))
+            continue
+        if len(chunk) >= chunk_size:
+            _save_chunk(chunk, result)
+            chunk = []
+    if chunk:
+        _save_chunk(chunk, result)
+    return result.as_dict()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk import reviews from a JSON, NDJSON or CSV file.")
+    parser.add_argument("path", help="File to import, or - for stdin")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="Input format (default: from file extension)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per transaction")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or detect_format(args.path)
+    if args.path == "-":
+        stream = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+        result = import_reviews(parse_reviews(stream, fmt), args.chunk_size)
+    else:
+        with open(args.path, encoding="utf-8", newline="") as stream:
+            result = import_reviews(parse_reviews(stream, fmt), args.chunk_size)
+
+    for error in result["errors"]:
+        print(f"row {error['row']}: {error['error']}", file=sys.stderr)
+    print(f"Imported {result['inserted']} reviews, {result['failed']} failed")
+    return 0 if result["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+"""
+Write-behind ingestion for reviews.
+When enabled, POST /reviews only validates and enqueues; a background writer
+saves queued reviews in multi-row batches once REVIEW_BATCH_SIZE reviews are
+waiting or REVIEW_FLUSH_INTERVAL seconds have passed, whichever comes first.
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import pymysql
+
+from services.reviews_backend import ROW_REJECTED_ERRORS, add_reviews, add_reviews_isolating, validate_review
+
+ReviewRow = Tuple[int, str, int, str]
+
+
+class ReviewWriter:
+    """
+    Bounded queue of validated reviews drained by one background thread.
+    submit() waits up to `put_timeout` seconds for room and then rejects the
+    review, so a stalled database pushes back on clients instead of growing
+    memory without limit. A batch that fails on the connection is retried up to
+    `max_retries` times; one the database refuses because of a bad row is saved
+    row by row, so only that row is dropped and logged. stats() counts reviews
+    turned away by a full queue as 'rejected' and rows the database refused as 'dropped'.
+    """
+
+    def __init__(
+        self,
+        max_queue: int,
+        batch_size: int,
+        flush_interval: float,
+        put_timeout: float = 0.5,
+        max_retries: int = 3,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.max_retries = max_retries
+        self._queue: "queue.Queue[ReviewRow]" = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'enqueued': 0,
+            'rejected': 0,
+            'written': 0,
+            'batches': 0,
+            'dropped': 0,
+            'failed': 0,
+        }
+
+    def _count(self, key: str, n: int = 1):
+        with self._stats_lock:
+            self._stats[key] += n
+
+    def start(self):
+        """
+        Start the writer thread for this process if it is not already running.
+        """
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._stop.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="review-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, study_spot_id: int, name: str, stars: int, review: str) -> bool:
+        """
+        Validate and enqueue a review.
+        Returns:
+            True if queued, False if the queue stayed full for `put_timeout` seconds
+        Raises:
+            ValueError for the same inputs add_review() rejects
+        """
+        validate_review(study_spot_id, name, stars, review)
+        self.start()
+        try:
+            self._queue.put((study_spot_id, name, stars, review), timeout=self.put_timeout)
+        except queue.Full:
+            self._count('rejected')
+            return False
+        self._count('enqueued')
+        return True
+
+    def _next_batch(self) -> List[ReviewRow]:
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _drain_nowait(self) -> List[ReviewRow]:
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _save_with_retries(self, rows: List[ReviewRow]) -> int:
+        attempts = max(1, self.max_retries)
+        for attempt in range(1, attempts + 1):
+            try:
+                add_reviews(rows)
+            except ROW_REJECTED_ERRORS:
+                raise
+            except pymysql.MySQLError as e:
+                print(f"Database error writing {len(rows)} queued reviews (attempt {attempt}): {e}")
+                if attempt == attempts:
+                    raise
+                time.sleep(min(2 ** attempt * 0.1, 2.0))
+            else:
+                self._count('written', len(rows))
+                self._count('batches')
+                return len(rows)
+
+    def _reject(self, row: ReviewRow, error: pymysql.MySQLError):
+        print(f"Dropping queued review for study spot {row[0]} by {row[1]!r}, rejected by the database: {error}")
+        self._count('dropped')
+
+    def _write(self, batch: List[ReviewRow]):
+        done = 0
+
+        def save(rows: List[ReviewRow]) -> int:
+            nonlocal done
+            written = self._save_with_retries(rows)
+            done += len(rows)
+            return written
+
+        def reject(row: ReviewRow, error: pymysql.MySQLError):
+            nonlocal done
+            done += 1
+            self._reject(row, error)
+
+        try:
+            add_reviews_isolating([(row, row) for row in batch], reject, save, ROW_REJECTED_ERRORS)
+        except pymysql.MySQLError:
+            # Still failing after max_retries; everything not yet saved or rejected is lost
+            self._count('failed', len(batch) - done)
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if batch:
+                self._write(batch)
+        # Drain whatever arrived before shutdown
+        batch = self._drain_nowait()
+        while batch:
+            self._write(batch)
+            batch = self._drain_nowait()
+
+    def flush(self):
+        """
+        Synchronously write everything currently queued.
+        """
+        batch = self._drain_nowait()
+        while batch:
+            self._write(batch)
+            batch = self._drain_nowait()
+
+    def stop(self, timeout: float = 10.0):
+        """
+        Stop the writer and save any queued reviews before returning.
+        """
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            thread.join(timeout)
+        self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return {**self._stats, 'queued': self._queue.qsize()}
+
+
+review_writer = ReviewWriter(
+    max_queue=int(os.getenv('REVIEW_QUEUE_SIZE', '10000')),
+    batch_size=int(os.getenv('REVIEW_BATCH_SIZE', '100')),
+    flush_interval=float(os.getenv('REVIEW_FLUSH_INTERVAL', '1.0')),
+    put_timeout=float(os.getenv('REVIEW_QUEUE_PUT_TIMEOUT', '0.5')),
+)
+
+# Save queued reviews when the worker shuts down gracefully
+atexit.register(review_writer.stop)
+
+
+def write_behind_enabled() -> bool:
+    """
+    True when REVIEW_INGESTION_MODE=async selects write-behind ingestion.
+    """
+    return os.getenv('REVIEW_INGESTION_MODE', 'sync').lower() == 'async'
+
+
+def enqueue_review(study_spot_id: int, name: str, stars: int, review: str) -> bool:
+    """
+    Validate a review and queue it for the background writer.
+    Returns:
+        False if the queue is full and the client should retry later
+    """
+    return review_writer.submit(study_spot_id, name, stars, review)
+
+
+def drain_review_queue(timeout: float = 10.0):
+    """
+    Shutdown hook: stop the background writer and save every queued review.
+    """
+    review_writer.stop(timeout)
+
+
+def get_review_queue_stats() -> Dict[str, int]:
+    """
+    Return enqueue/write counters for the write-behind queue.
+    """
+    return review_writer.stats()
@@ -1,97 +1,392 @@
-import pymysql
-from typing import List, Dict, Any
-# Import the connection helper from your existing database.py
-from services.database import get_db_connection
-
-# --- 1. Insert Function (Saver) ---
-def add_review(study_spot_id: int, name: str, stars: int, review: str) -> Dict[str, Any]:
-    """
-    Validates input and saves a new review to the database.
-    """
-    # Input Validation
-    if not isinstance(study_spot_id, int) or study_spot_id <= 0:
-        raise ValueError("Study spot ID must be a positive integer.")
-    if not name or not name.strip():
-        raise ValueError("Name cannot be empty.")
-    if not review or not review.strip():
-        raise ValueError("Review text cannot be empty.")
-    if not isinstance(stars, int) or not (1 <= stars <= 5):
-        raise ValueError("Stars must be an integer between 1 and 5.")
-
-    try:
-        connection = get_db_connection()
-        with connection.cursor() as cursor:
-            # Parameterized Query to prevent SQL Injection
-            sql = "INSERT INTO reviews (studySpotId, name, stars, review) VALUES (%s, %s, %s, %s)"
-            cursor.execute(sql, (study_spot_id, name, stars, review))
-        
-        connection.commit()
-        return {"message": "Review added successfully", "status": "success"}
-        
-    except pymysql.MySQLError as e:
-        if 'connection' in locals() and connection.open:
-            connection.rollback() # Undo changes if error occurs
-        print(f"Database error: {e}")
-        return {"message": "Failed to save review", "error": str(e)}
-        
-    finally:
-        # Ensure connection closes even if an error happens
-        if 'connection' in locals() and connection.open:
-            connection.close()
-
-# --- 2. Fetch Function (Getter) ---
-def get_all_reviews() -> List[Dict[str, Any]]:
-    """
-    Retrieves all reviews ordered by newest first.
-    """
-    try:
-        connection = get_db_connection()
-        with connection.cursor() as cursor:
-            sql = "SELECT id, studySpotId, name, stars, review, created_at FROM reviews ORDER BY created_at DESC"
-            cursor.execute(sql)
-            result = cursor.fetchall()
-            
-            # Helper to format timestamps to string (JSON compatible)
-            for row in result:
-                if row['created_at']:
-                    row['created_at'] = row['created_at'].strftime('%Y-%m-%d %H:%M:%S')
-            
-            return result
-            
-    except pymysql.MySQLError as e:
-        print(f"Database error: {e}")
-        return []
-        
-    finally:
-        if 'connection' in locals() and connection.open:
-            connection.close()
-
-# --- 3. Get Reviews for Specific Study Spot ---
-def get_reviews_by_study_spot(study_spot_id: int) -> List[Dict[str, Any]]:
-    """
-    Retrieves all reviews for a specific study spot ordered by newest first.
-    """
-    if not isinstance(study_spot_id, int) or study_spot_id <= 0:
-        raise ValueError("Study spot ID must be a positive integer.")
-    
-    try:
-        connection = get_db_connection()
-        with connection.cursor() as cursor:
-            sql = "SELECT id, studySpotId, name, stars, review, created_at FROM reviews WHERE studySpotId = %s ORDER BY created_at DESC"
-            cursor.execute(sql, (study_spot_id,))
-            result = cursor.fetchall()
-            
-            # Helper to format timestamps to string (JSON compatible)
-            for row in result:
-                if row['created_at']:
-                    row['created_at'] = row['created_at'].strftime('%Y-%m-%d %H:%M:%S')
-            
-            return result
-            
-    except pymysql.MySQLError as e:
-        print(f"Database error: {e}")
-        return []
-        
-    finally:
-        if 'connection' in locals() and connection.open:
-            connection.close()
\ No newline at end of file
+import base64
+import pymysql
+from datetime import datetime
+from typing import List, Dict, Any, Callable, Iterator, Optional, Sequence, Tuple
+# Import the connection helper from your existing database.py
+from services.database import get_db_connection, pin_reads_to_primary
+from services.metrics import db_span, span
+from services.review_aggregates import record_review
+
+INSERT_REVIEW_SQL = "INSERT INTO reviews (studySpotId, name, stars, review) VALUES (%s, %s, %s, %s)"
+SELECT_REVIEWS_SQL = "SELECT id, studySpotId, name, stars, review, created_at FROM reviews ORDER BY created_at DESC"
+SELECT_SPOT_REVIEWS_SQL = "SELECT id, studySpotId, name, stars, review, created_at FROM reviews WHERE studySpotId = %s ORDER BY created_at DESC"
+
+# --- 0. Input Validation ---
+def validate_review(study_spot_id: int, name: str, stars: int, review: str):
+    """
+    Raises ValueError if a review cannot be saved as given.
+    """
+    if not isinstance(study_spot_id, int) or study_spot_id <= 0:
+        raise ValueError("Study spot ID must be a positive integer.")
+    if not name or not name.strip():
+        raise ValueError("Name cannot be empty.")
+    if not review or not review.strip():
+        raise ValueError("Review text cannot be empty.")
+    if not isinstance(stars, int) or not (1 <= stars <= 5):
+        raise ValueError("Stars must be an integer between 1 and 5.")
+
+# --- 1. Insert Function (Saver) ---
+def add_review(study_spot_id: int, name: str, stars: int, review: str) -> Dict[str, Any]:
+    """
+    Validates input and saves a new review to the database.
+    """
+    validate_review(study_spot_id, name, stars, review)
+
+    try:
+        connection = get_db_connection()
+        if not connection:
+            raise pymysql.MySQLError("Unable to connect to the database.")
+        with connection.cursor() as cursor:
+            # Parameterized Query to prevent SQL Injection
+            with db_span("reviews.insert"):
+                cursor.execute(INSERT_REVIEW_SQL, (study_spot_id, name, stars, review))
+        
+        with db_span("reviews.commit"):
+            connection.commit()
+        pin_reads_to_primary()
+        record_review(study_spot_id, stars)
+        return {"message": "Review added successfully", "status": "success"}
+        
+    except pymysql.MySQLError as e:
+        if 'connection' in locals() and connection and connection.open:
+            connection.rollback() # Undo changes if error occurs
+        print(f"Database error: {e}")
+        return {"message": "Failed to save review", "error": str(e)}
+        
+    finally:
+        # Ensure connection closes even if an error happens. A connection whose
+        # socket died reports open == False but still has to go back to the pool.
+        if 'connection' in locals() and connection:
+            connection.close()
+
+# --- 2. Fetch Function (Getter) ---
+def get_all_reviews() -> List[Dict[str, Any]]:
+    """
+    Retrieves all reviews ordered by newest first.
+    """
+    try:
+        connection = get_db_connection(read_only=True)
+        if not connection:
+            raise pymysql.MySQLError("Unable to connect to the database.")
+        with connection.cursor() as cursor:
+            sql = SELECT_REVIEWS_SQL
+            with db_span("reviews.all"):
+                cursor.execute(sql)
+                result = cursor.fetchall()
+            
+            # Helper to format timestamps to string (JSON compatible)
+            with span("reviews.format"):
+                for row in result:
+                    if row['created_at']:
+                        row['created_at'] = row['created_at'].strftime('%Y-%m-%d %H:%M:%S')
+            
+            return result
+            
+    except pymysql.MySQLError as e:
+        print(f"Database error: {e}")
+        return []
+        
+    finally:
+        if 'connection' in locals() and connection:
+            connection.close()
+
+# --- 3. Get Reviews for Specific Study Spot ---
+def get_reviews_by_study_spot(study_spot_id: int) -> List[Dict[str, Any]]:
+    """
+    Retrieves all reviews for a specific study spot ordered by newest first.
+    """
+    if not isinstance(study_spot_id, int) or study_spot_id <= 0:
+        raise ValueError("Study spot ID must be a positive integer.")
+    
+    try:
+        connection = get_db_connection(read_only=True)
+        if not connection:
+            raise pymysql.MySQLError("Unable to connect to the database.")
+        with connection.cursor() as cursor:
+            sql = SELECT_SPOT_REVIEWS_SQL
+            with db_span("reviews.by_spot"):
+                cursor.execute(sql, (study_spot_id,))
+                result = cursor.fetchall()
+            
+            # Helper to format timestamps to string (JSON compatible)
+            with span("reviews.format"):
+                for row in result:
+                    if row['created_at']:
+                        row['created_at'] = row['created_at'].strftime('%Y-%m-%d %H:%M:%S')
+            
+            return result
+            
+    except pymysql.MySQLError as e:
+        print(f"Database error: {e}")
+        return []
+        
+    finally:
+        if 'connection' in locals() and connection:
+            connection.close()
+
+# --- 4. Paginated Getter (Keyset on created_at, id) ---
+REVIEW_FIELDS = ("id", "studySpotId", "name", "stars", "review", "created_at")
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def encode_review_cursor(created_at: Optional[str], review_id: int) -> str:
+    """
+    Pack the (created_at, id) position of the last review on a page into an opaque token.
+    """
+    raw = f"{created_at or ''}|{review_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_review_cursor(cursor: str):
+    """
+    Reverse encode_review_cursor(). Raises ValueError for a malformed token.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, review_id = base64.urlsafe_b64decode(padded.encode()).decode().rsplit("|", 1)
+        if created_at:
+            datetime.strptime(created_at, TIMESTAMP_FORMAT)
+        return created_at or None, int(review_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor.")
+
+
+def get_reviews_page(
+    study_spot_id: Optional[int] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    fields: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Retrieves one page of reviews ordered by newest first, optionally for one study spot.
+    Pages are keyed on (created_at, id), so each page is an index range scan no
+    matter how deep the client has scrolled. `fields` limits the returned columns.
+    Returns:
+        {"reviews": [...], "next_cursor": str or None}
+    """
+    if study_spot_id is not None and (not isinstance(study_spot_id, int) or study_spot_id <= 0):
+        raise ValueError("Study spot ID must be a positive integer.")
+    if not isinstance(limit, int) or not (1 <= limit <= MAX_PAGE_SIZE):
+        raise ValueError(f"Limit must be an integer between 1 and {MAX_PAGE_SIZE}.")
+    fields = list(fields) if fields else list(REVIEW_FIELDS)
+    unknown = [f for f in fields if f not in REVIEW_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown review field(s): {', '.join(unknown)}")
+
+    # id and created_at are always read because the next cursor is built from them
+    columns = [f for f in REVIEW_FIELDS if f in fields or f in ("id", "created_at")]
+    conditions, params = [], []
+    if study_spot_id is not None:
+        conditions.append("studySpotId = %s")
+        params.append(study_spot_id)
+    if cursor:
+        after_created_at, after_id = decode_review_cursor(cursor)
+        if after_created_at is None:
+            # NULL timestamps sort last in DESC order
+            conditions.append("(created_at IS NULL AND id < %s)")
+            params.append(after_id)
+        else:
+            conditions.append("(created_at < %s OR (created_at = %s AND id < %s) OR created_at IS NULL)")
+            params.extend([after_created_at, after_created_at, after_id])
+
+    sql = f"SELECT {', '.join(columns)} FROM reviews"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY created_at DESC, id DESC LIMIT %s"
+    # Fetch one extra row to learn whether another page exists
+    params.append(limit + 1)
+
+    try:
+        connection = get_db_connection(read_only=True)
+        if not connection:
+            raise pymysql.MySQLError("Unable to connect to the database.")
+        with connection.cursor() as db_cursor:
+            with db_span("reviews.page"):
+                db_cursor.execute(sql, tuple(params))
+                rows = list(db_cursor.fetchall())
+
+        with span("reviews.format"):
+            for row in rows:
+                if row['created_at']:
+                    row['created_at'] = row['created_at'].strftime(TIMESTAMP_FORMAT)
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_review_cursor(last['created_at'], last['id'])
+
+        reviews = [{f: row[f] for f in fields} for row in rows]
+        return {"reviews": reviews, "next_cursor": next_cursor}
+
+    except pymysql.MySQLError as e:
+        print(f"Database error: {e}")
+        return {"reviews": [], "next_cursor": None}
+
+    finally:
+        if 'connection' in locals() and connection:
+            connection.close()
+
+# --- 5. Streaming Getter (Server-side cursor) ---
+STREAM_BATCH_SIZE = 500
+
+
+def _iter_streamed_rows(connection, db_cursor, batch_size: int) -> Iterator[Dict[str, Any]]:
+    finished = False
+    try:
+        while True:
+            rows = db_cursor.fetchmany(batch_size)
+            if not rows:
+                finished = True
+                return
+            for row in rows:
+                if row['created_at']:
+                    row['created_at'] = row['created_at'].strftime(TIMESTAMP_FORMAT)
+                yield row
+    except pymysql.MySQLError as e:
+        # Re-raised so the response is aborted rather than closed as a complete, truncated listing
+        print(f"Database error while streaming reviews: {e}")
+        raise
+    finally:
+        if finished:
+            db_cursor.close()
+            connection.close()
+        else:
+            # Draining the rest of an unbuffered result could take as long as the
+            # whole query, so drop the connection rather than return it to the pool
+            connection.discard()
+
+
+def stream_reviews(study_spot_id: Optional[int] = None, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Runs the review listing on an unbuffered server-side cursor and returns an
+    iterator over its rows, newest first. Only `batch_size` rows are held in
+    memory at a time. The query runs before this returns, so connection and
+    query errors raise here rather than part way through a response.
+    """
+    if study_spot_id is not None and (not isinstance(study_spot_id, int) or study_spot_id <= 0):
+        raise ValueError("Study spot ID must be a positive integer.")
+
+    sql = "SELECT id, studySpotId, name, stars, review, created_at FROM reviews"
+    params: tuple = ()
+    if study_spot_id is not None:
+        sql += " WHERE studySpotId = %s"
+        params = (study_spot_id,)
+    sql += " ORDER BY created_at DESC"
+
+    connection = get_db_connection(read_only=True)
+    if not connection:
+        raise pymysql.MySQLError("Unable to connect to the database.")
+    try:
+        db_cursor = connection.cursor(pymysql.cursors.SSDictCursor)
+        with db_span("reviews.stream"):
+            db_cursor.execute(sql, params)
+    except Exception:
+        connection.discard()
+        raise
+    return _iter_streamed_rows(connection, db_cursor, batch_size)
+
+# --- 6. Listing Version (conditional GET) ---
+
+
+def get_reviews_version(study_spot_id: Optional[int] = None) -> Optional[Tuple[str, Optional[datetime]]]:
+    """
+    Cheap version token for a full review listing, so a conditional GET can be
+    answered with one aggregate query instead of reading the listing.
+    Reviews are only inserted or deleted, which changes the count or the newest id.
+    Returns:
+        (ETag, newest created_at or None), or None if the database could not be read
+    """
+    if study_spot_id is not None and (not isinstance(study_spot_id, int) or study_spot_id <= 0):
+        raise ValueError("Study spot ID must be a positive integer.")
+
+    sql = "SELECT COUNT(*) AS n, MAX(id) AS max_id, MAX(created_at) AS latest FROM reviews"
+    params: tuple = ()
+    if study_spot_id is not None:
+        sql += " WHERE studySpotId = %s"
+        params = (study_spot_id,)
+
+    connection = get_db_connection(read_only=True)
+    if not connection:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            with db_span("reviews.version"):
+                cursor.execute(sql, params)
+                row = cursor.fetchone()
+    except pymysql.MySQLError as e:
+        print(f"Database error: {e}")
+        return None
+    finally:
+        connection.close()
+
+    latest = row['latest']
+    if isinstance(latest, str):
+        # SQLite returns aggregates of timestamp columns as text
+        latest = datetime.strptime(latest, TIMESTAMP_FORMAT)
+    return f"reviews-{study_spot_id or 'all'}-{row['n']}-{row['max_id'] or 0}", latest
+
+# --- 7. Batch Insert ---
+
+
+def add_reviews(rows: Sequence[Sequence[Any]]) -> int:
+    """
+    Saves already-validated (studySpotId, name, stars, review) rows in one
+    transaction. pymysql's executemany sends them as a single multi-row INSERT.
+    Returns:
+        Number of rows inserted
+    Raises:
+        pymysql.MySQLError if the batch could not be saved; nothing is committed
+    """
+    if not rows:
+        return 0
+
+    connection = get_db_connection()
+    if not connection:
+        raise pymysql.MySQLError("Unable to connect to the database.")
+    try:
+        with db_span("reviews.insert_many"):
+            with connection.cursor() as cursor:
+                cursor.executemany(INSERT_REVIEW_SQL, [tuple(row) for row in rows])
+            connection.commit()
+        pin_reads_to_primary()
+    except pymysql.MySQLError:
+        if connection.open:
+            connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+    for study_spot_id, _name, stars, _review in rows:
+        record_review(study_spot_id, stars)
+    return len(rows)
+
+
+# Errors caused by the rows themselves (e.g. a deleted study spot, a value that is
+# too long) rather than by the connection: retrying the same rows can't succeed
+ROW_REJECTED_ERRORS = (pymysql.err.IntegrityError, pymysql.err.DataError)
+
+
+def add_reviews_isolating(
+    items: Sequence[Tuple[Any, Sequence[Any]]],
+    on_rejected: Callable[[Any, pymysql.MySQLError], None],
+    save: Callable[[List[Sequence[Any]]], int] = add_reviews,
+    rejected_errors: Tuple[type, ...] = (pymysql.MySQLError,),
+) -> int:
+    """
+    Save (key, row) items in one transaction with save(). If the batch fails with
+    one of `rejected_errors` it was rolled back, so the rows are saved one at a
+    time and only the rows the database rejects are lost; on_rejected(key, error)
+    is called for each of them. Other errors propagate.
+    Returns:
+        Number of rows inserted
+    """
+    try:
+        return save([row for _, row in items])
+    except rejected_errors as e:
+        if len(items) == 1:
+            on_rejected(items[0][0], e)
+            return 0
+    return sum(add_reviews_isolating([item], on_rejected, save, rejected_errors) for item in items)
@@ -0,0 +1,47 @@
+"""
+Environment settings loaded from .env files.
+Project/.env holds the database credentials and src/backend/.env any local
+overrides; variables already set in the real environment always win.
+"""
+import os
+import threading
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+PROJECT_ROOT = Path(__file__).resolve().parents[3]
+# Highest precedence first: a file never overrides a variable that is already set,
+# so the backend overrides are read before the project defaults
+ENV_FILES = (BACKEND_DIR / ".env", PROJECT_ROOT / ".env")
+
+_loaded = False
+_lock = threading.Lock()
+
+
+def load_settings():
+    """
+    Load the .env files into os.environ, once per process. python-dotenv is only
+    imported when a file exists, so deployments configured through real
+    environment variables (e.g. Render) skip it entirely.
+    """
+    global _loaded
+    if _loaded:
+        return
+    with _lock:
+        if _loaded:
+            return
+        env_files = [path for path in ENV_FILES if path.is_file()]
+        if env_files:
+            try:
+                from dotenv import load_dotenv  # type: ignore
+            except ImportError:  # pragma: no cover - fallback if dependency missing during linting
+                load_dotenv = None
+            for path in env_files if load_dotenv else ():
+                load_dotenv(path)
+        _loaded = True
+
+
+def env_flag(name: str) -> bool:
+    """
+    True if the environment variable is set to 1, true or yes.
+    """
+    return os.getenv(name, "").strip().lower() in ("1", "true", "yes")
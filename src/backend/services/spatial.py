@@ -0,0 +1,101 @@
+"""
+Spatial index over study spot coordinates.
+Spots are bucketed into a fixed grid of `cell_deg` degree cells, so a radius
+query only measures the spots in the handful of cells its bounding box covers.
+"""
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from services.catalog_memo import CatalogMemo
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE_LAT = 111320.0
+DEFAULT_CELL_DEG = 0.01  # about 1.1 km north-south
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """
+    Great-circle distance between two points in meters.
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _coordinates(spot: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    try:
+        lat, lng = float(spot.get("latitude")), float(spot.get("longitude"))
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(lat) or math.isnan(lng):
+        return None
+    return lat, lng
+
+
+class SpatialIndex:
+    """
+    Grid index of the spots that have usable latitude/longitude values.
+    """
+
+    def __init__(self, spots: Sequence[Dict[str, Any]], cell_deg: float = DEFAULT_CELL_DEG):
+        self.spots = list(spots)
+        self.cell_deg = cell_deg
+        self._points: List[Optional[Tuple[float, float]]] = [_coordinates(s) for s in self.spots]
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+        for i, point in enumerate(self._points):
+            if point is not None:
+                self._cells.setdefault(self._cell(*point), []).append(i)
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg)
+
+    def candidates(self, lat: float, lng: float, radius_m: float) -> List[int]:
+        """
+        Positions of spots in the grid cells covering the radius' bounding box.
+        """
+        dlat = radius_m / METERS_PER_DEGREE_LAT
+        cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+        dlng = min(180.0, radius_m / (METERS_PER_DEGREE_LAT * cos_lat))
+        lat_lo, lng_lo = self._cell(lat - dlat, lng - dlng)
+        lat_hi, lng_hi = self._cell(lat + dlat, lng + dlng)
+
+        found = []
+        if (lat_hi - lat_lo + 1) * (lng_hi - lng_lo + 1) > len(self._cells):
+            # The box covers more cells than are occupied; walk the occupied ones instead
+            for (cell_lat, cell_lng), members in self._cells.items():
+                if lat_lo <= cell_lat <= lat_hi and lng_lo <= cell_lng <= lng_hi:
+                    found.extend(members)
+            return found
+        for cell_lat in range(lat_lo, lat_hi + 1):
+            for cell_lng in range(lng_lo, lng_hi + 1):
+                found.extend(self._cells.get((cell_lat, cell_lng), ()))
+        return found
+
+    def nearby(self, lat: float, lng: float, radius_m: float, limit: Optional[int] = None) -> List[Tuple[int, float]]:
+        """
+        Spots within `radius_m` meters, nearest first, ties broken by id.
+        Returns:
+            List of (position in catalog, distance in meters)
+        """
+        hits = []
+        for i in self.candidates(lat, lng, radius_m):
+            point = self._points[i]
+            distance = haversine_m(lat, lng, point[0], point[1])
+            if distance <= radius_m:
+                hits.append((distance, self.spots[i].get("id") or 0, i))
+        hits.sort()
+        if limit is not None:
+            hits = hits[:limit]
+        return [(i, distance) for distance, _, i in hits]
+
+
+_indexes: CatalogMemo[SpatialIndex] = CatalogMemo(SpatialIndex)
+
+
+def get_spatial_index(spots: Sequence[Dict[str, Any]]) -> SpatialIndex:
+    """
+    Return a spatial index for `spots`, reusing the last one while the catalog is unchanged.
+    """
+    return _indexes.get(spots)
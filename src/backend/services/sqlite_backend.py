@@ -0,0 +1,261 @@
+"""
+Embedded SQLite storage backend.
+Set DB_BACKEND=sqlite (and optionally SQLITE_PATH) to serve the catalog and
+reviews from a local file instead of the remote MySQL server. Connections
+speak the part of the pymysql API the services use: dict rows, %s
+placeholders, commit/rollback/ping, and pymysql exception types, so the
+service code and its error handling are the same for both backends.
+
+Command line usage (from src/backend):
+    python -m services.sqlite_backend init [path]          # create an empty database
+    python -m services.sqlite_backend copy-from-mysql [path]  # snapshot the MySQL tables
+"""
+import argparse
+import functools
+import os
+import sqlite3
+import sys
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+import pymysql
+
+DEFAULT_SQLITE_PATH = "uwdialed.sqlite3"
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Compiled statements kept per connection, so repeated queries skip parsing
+STATEMENT_CACHE_SIZE = 256
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS UWDialedStudyData (
+    id INTEGER PRIMARY KEY,
+    location TEXT,
+    latitude REAL,
+    longitude REAL,
+    busyness_estimate INTEGER,
+    power_options TEXT,
+    nearby_food_drink_options TEXT,
+    noise_level TEXT,
+    natural_lighting TEXT
+);
+CREATE TABLE IF NOT EXISTS reviews (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    studySpotId INTEGER NOT NULL REFERENCES UWDialedStudyData (id),
+    name TEXT NOT NULL,
+    stars INTEGER NOT NULL,
+    review TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_reviews_created_at_id ON reviews (created_at, id);
+CREATE INDEX IF NOT EXISTS idx_reviews_spot_created_at_id ON reviews (studySpotId, created_at, id);
+"""
+
+# MySQL returns DATETIME columns as datetime objects, and the review getters rely on it
+# (fromisoformat reads "YYYY-MM-DD HH:MM:SS" several times faster than strptime)
+sqlite3.register_converter("TIMESTAMP", lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_adapter(datetime, lambda value: value.strftime(TIMESTAMP_FORMAT))
+
+
+def sqlite_path() -> str:
+    return os.getenv("SQLITE_PATH", DEFAULT_SQLITE_PATH)
+
+
+@functools.lru_cache(maxsize=STATEMENT_CACHE_SIZE)
+def _translate(sql: str) -> str:
+    # pymysql uses %s placeholders; sqlite3 uses ?
+    return sql.replace("%s", "?")
+
+
+def _as_pymysql_error(err: sqlite3.Error) -> pymysql.Error:
+    if isinstance(err, sqlite3.IntegrityError):
+        return pymysql.err.IntegrityError(str(err))
+    if isinstance(err, sqlite3.OperationalError):
+        return pymysql.err.OperationalError(str(err))
+    if isinstance(err, sqlite3.ProgrammingError):
+        return pymysql.err.ProgrammingError(str(err))
+    return pymysql.err.DatabaseError(str(err))
+
+
+class SQLiteCursor:
+    """
+    pymysql-style dict cursor over an sqlite3 cursor.
+    """
+
+    def __init__(self, connection: sqlite3.Connection):
+        self._cursor = connection.cursor()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self) -> Optional[int]:
+        return self._cursor.lastrowid
+
+    def execute(self, sql: str, params: Iterable[Any] = ()) -> int:
+        try:
+            self._cursor.execute(_translate(sql), tuple(params or ()))
+        except sqlite3.Error as err:
+            raise _as_pymysql_error(err) from err
+        return self._cursor.rowcount
+
+    def executemany(self, sql: str, seq_of_params: Iterable[Iterable[Any]]) -> int:
+        try:
+            self._cursor.executemany(_translate(sql), seq_of_params)
+        except sqlite3.Error as err:
+            raise _as_pymysql_error(err) from err
+        return self._cursor.rowcount
+
+    def _as_dicts(self, rows: List[tuple]) -> List[Dict[str, Any]]:
+        columns = [column[0] for column in self._cursor.description or ()]
+        return [dict(zip(columns, row)) for row in rows]
+
+    def fetchone(self) -> Optional[Dict[str, Any]]:
+        row = self._cursor.fetchone()
+        return None if row is None else self._as_dicts([row])[0]
+
+    def fetchmany(self, size: int = 1) -> List[Dict[str, Any]]:
+        return self._as_dicts(self._cursor.fetchmany(size))
+
+    def fetchall(self) -> List[Dict[str, Any]]:
+        return self._as_dicts(self._cursor.fetchall())
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """
+    pymysql-style connection to an SQLite file in WAL mode.
+    """
+
+    def __init__(self, path: str):
+        try:
+            self._connection = sqlite3.connect(
+                path,
+                detect_types=sqlite3.PARSE_DECLTYPES,
+                # Pooled connections move between request threads, one at a time
+                check_same_thread=False,
+                cached_statements=STATEMENT_CACHE_SIZE,
+                timeout=5,
+            )
+            # WAL lets readers run alongside a writer; NORMAL is durable enough with WAL
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute("PRAGMA foreign_keys=ON")
+        except sqlite3.Error as err:
+            raise _as_pymysql_error(err) from err
+        self.open = True
+
+    def cursor(self, cursorclass=None) -> SQLiteCursor:
+        # Results are always buffered; SSDictCursor callers just see batches via fetchmany
+        return SQLiteCursor(self._connection)
+
+    def ping(self, reconnect: bool = False):
+        if not self.open:
+            raise pymysql.err.InterfaceError("Connection is closed.")
+
+    def commit(self):
+        try:
+            self._connection.commit()
+        except sqlite3.Error as err:
+            raise _as_pymysql_error(err) from err
+
+    def rollback(self):
+        self._connection.rollback()
+
+    def close(self):
+        if self.open:
+            self._connection.close()
+            self.open = False
+
+
+_initialized_paths = set()
+
+
+def connect(path: Optional[str] = None) -> SQLiteConnection:
+    """
+    Open a connection to the SQLite database at `path` (default: SQLITE_PATH),
+    creating the schema the first time this process opens that file.
+    """
+    path = path or sqlite_path()
+    if path not in _initialized_paths:
+        try:
+            init_schema(path)
+        except sqlite3.Error as err:
+            raise _as_pymysql_error(err) from err
+        _initialized_paths.add(path)
+    return SQLiteConnection(path)
+
+
+def init_schema(path: Optional[str] = None):
+    """
+    Create the tables and indexes if they do not exist yet.
+    """
+    connection = sqlite3.connect(path or sqlite_path())
+    try:
+        connection.executescript(SCHEMA)
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def copy_from_mysql(mysql_config: Dict[str, Any], path: Optional[str] = None) -> Dict[str, int]:
+    """
+    Replace the SQLite tables' contents with a snapshot of the MySQL ones.
+    Returns:
+        Rows copied per table
+    """
+    init_schema(path)
+    source = pymysql.connect(**mysql_config)
+    target = sqlite3.connect(path or sqlite_path())
+    copied = {}
+    try:
+        target.execute("PRAGMA foreign_keys=OFF")
+        for table in ("reviews", "UWDialedStudyData"):
+            target.execute(f"DELETE FROM {table}")
+        for table in ("UWDialedStudyData", "reviews"):
+            columns = [row[1] for row in target.execute(f"PRAGMA table_info({table})")]
+            with source.cursor() as cursor:
+                cursor.execute(f"SELECT {', '.join(columns)} FROM {table}")
+                rows = cursor.fetchall()
+            target.executemany(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                ([row[column] for column in columns] for row in rows),
+            )
+            copied[table] = len(rows)
+        target.commit()
+    finally:
+        target.close()
+        source.close()
+    return copied
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Manage the embedded SQLite database.")
+    parser.add_argument("command", choices=("init", "copy-from-mysql"))
+    parser.add_argument("path", nargs="?", help=f"Database file (default: SQLITE_PATH or {DEFAULT_SQLITE_PATH})")
+    args = parser.parse_args(argv)
+
+    if args.command == "init":
+        init_schema(args.path)
+        print(f"Initialized {args.path or sqlite_path()}")
+        return 0
+
+    from services.database import DB_CONFIG
+    try:
+        copied = copy_from_mysql(DB_CONFIG, args.path)
+    except pymysql.Error as err:
+        print(f"Error copying from MySQL: {err}", file=sys.stderr)
+        return 1
+    print(", ".join(f"{table}: {count} rows" for table, count in copied.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
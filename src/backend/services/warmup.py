@@ -0,0 +1,79 @@
+"""
+Opt-in warmup: build the lazily initialized state before the first request needs it.
+Nothing here runs at import or in create_app() unless WARMUP is set, and then
+only on a background thread, so workers start accepting requests immediately.
+"""
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+from services.database import get_all_study_spots, get_db_connection
+from services.facets import get_facet_index
+from services.metrics import span
+from services.recommendation import get_engine
+from services.review_aggregates import rebuild_review_aggregates
+from services.spatial import get_spatial_index
+
+
+def _open_pool() -> bool:
+    connection = get_db_connection()
+    if connection is None:
+        return False
+    connection.close()
+    return True
+
+
+def _load_catalog() -> bool:
+    return bool(get_all_study_spots())
+
+
+def _build_indexes() -> bool:
+    spots = get_all_study_spots()
+    if not spots:
+        return False
+    get_engine(spots)
+    get_facet_index(spots)
+    get_spatial_index(spots)
+    return True
+
+
+# Run in order: the catalog load reuses the pooled connection, the indexes the loaded catalog
+WARMUP_STEPS: List[Tuple[str, Callable[[], bool]]] = [
+    ("db.pool", _open_pool),
+    ("catalog", _load_catalog),
+    ("indexes", _build_indexes),
+    ("review_aggregates", rebuild_review_aggregates),
+]
+
+
+def warm_up() -> Dict[str, float]:
+    """
+    Run every warmup step; a failing step is reported and skipped, and the
+    request that needs it later builds it as usual.
+    Returns:
+        Seconds taken per step that succeeded
+    """
+    timings = {}
+    for name, step in WARMUP_STEPS:
+        started = time.perf_counter()
+        try:
+            with span(f"warmup.{name}"):
+                ok = step()
+        except Exception as err:
+            print(f"Warmup step {name} failed: {err}")
+            continue
+        if not ok:
+            print(f"Warmup step {name} failed")
+            continue
+        timings[name] = time.perf_counter() - started
+    print("Warmup done: " + ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in timings.items()))
+    return timings
+
+
+def start_warmup() -> threading.Thread:
+    """
+    Run warm_up() on a daemon thread.
+    """
+    thread = threading.Thread(target=warm_up, name="warmup", daemon=True)
+    thread.start()
+    return thread
@@ -14,6 +14,29 @@ const api = axios.create({
   },
 });
 
+// Read-your-own-writes: after a write the API returns this header for a few seconds.
+// Sending it back keeps our reads on the primary database, whichever server answers.
+const READ_PIN_HEADER = 'X-Read-Primary-Until';
+let readPin = null;
+
+api.interceptors.request.use((config) => {
+  if (readPin) {
+    config.headers[READ_PIN_HEADER] = readPin;
+  }
+  return config;
+});
+
+api.interceptors.response.use((response) => {
+  const pin = response.headers[READ_PIN_HEADER.toLowerCase()];
+  if (pin) {
+    readPin = pin;
+  } else if (response.config.headers[READ_PIN_HEADER] === readPin) {
+    // We sent the current pin and the API didn't repeat it, so it has expired
+    readPin = null;
+  }
+  return response;
+});
+
 // Study spots API
 export const studySpotsAPI = {
   getAll: () => api.get('/study-spots'),